@@ -7,7 +7,24 @@
 """
 
 import streamlit as st
-from typing import Optional
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+
+def _load_secrets() -> Mapping:
+    """
+    一次性读取 Streamlit Secrets 并缓存为只读映射
+
+    secrets 未配置（本地无 secrets.toml）时返回空映射
+    """
+    try:
+        return MappingProxyType(dict(st.secrets))
+    except Exception:
+        return MappingProxyType({})
+
+
+# 模块导入时读取一次，后续所有查找都走内存
+_SECRETS: Mapping = _load_secrets()
 
 
 def _get_secret(key: str, default: str = "") -> str:
@@ -18,23 +35,18 @@ def _get_secret(key: str, default: str = "") -> str:
     1. st.secrets（Streamlit Cloud 或本地 .streamlit/secrets.toml）
     2. 默认值
     """
-    try:
-        # 尝试从 secrets 读取
-        value = st.secrets.get(key, None)
-        if value is not None:
-            return str(value)
-        return default
-    except Exception:
-        # secrets 未配置时返回默认值
-        return default
+    value = _SECRETS.get(key)
+    if value is not None:
+        return str(value)
+    return default
 
 
 def _get_secret_nested(section: str, key: str, default: str = "") -> str:
     """获取嵌套的 secret 配置，如 [passwords] 下的值"""
-    try:
-        return str(st.secrets[section][key])
-    except Exception:
-        return default
+    sec = _SECRETS.get(section)
+    if isinstance(sec, Mapping) and key in sec:
+        return str(sec[key])
+    return default
 
 
 # ========================================
@@ -101,6 +113,13 @@ PRODUCT_TO_SALES_TABLE = {
 # ========================================
 APP_PASSWORD: str = _get_secret("APP_PASSWORD")
 
+# 多角色密码（[passwords] 节），导入时物化一次
+_PASSWORDS: dict = (
+    dict(_SECRETS["passwords"])
+    if "passwords" in _SECRETS and isinstance(_SECRETS["passwords"], Mapping)
+    else {}
+)
+
 
 def get_user_role(password: str) -> Optional[str]:
     """
@@ -109,13 +128,9 @@ def get_user_role(password: str) -> Optional[str]:
     Returns:
         "admin" / "editor" / "viewer" / None
     """
-    try:
-        passwords = st.secrets.get("passwords", {})
-        for role, pwd in passwords.items():
-            if password == pwd:
-                return role
-    except Exception:
-        pass
+    for role, pwd in _PASSWORDS.items():
+        if password == pwd:
+            return role
     
     # 单密码模式
     if APP_PASSWORD and password == APP_PASSWORD:
@@ -127,11 +142,14 @@ def get_user_role(password: str) -> Optional[str]:
 # ========================================
 # 配置验证
 # ========================================
+# 以下结果只依赖导入时确定的常量，缓存后每次 rerun 直接复用
+@st.cache_data(ttl=None)
 def is_configured() -> bool:
     """检查是否已完成基本配置"""
     return bool(FEISHU_APP_ID and FEISHU_APP_SECRET and FEISHU_APP_TOKEN)
 
 
+@st.cache_data(ttl=None)
 def is_marketing_configured() -> bool:
     """检查市场推广模块是否已配置"""
     return bool(
@@ -142,6 +160,7 @@ def is_marketing_configured() -> bool:
     )
 
 
+@st.cache_data(ttl=None)
 def get_config_status() -> dict:
     """获取配置状态（用于调试）"""
     return {
@@ -1,5 +1,6 @@
 # core/budget_calculator.py - 基于新结构
 import pandas as pd
+from pandas.api.types import is_numeric_dtype
 from datetime import datetime
 from typing import Dict, List
 from core.income_calculator import IncomeCalculator
@@ -224,7 +225,12 @@ class BudgetCalculator:
         """确保列存在且为数值"""
         if column not in df.columns:
             df[column] = 0.0
-        df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0)
+            return df[column]
+        series = df[column]
+        if is_numeric_dtype(series) and not series.isna().any():
+            # 已是无缺失的数值列，无需重新转换
+            return series
+        df[column] = pd.to_numeric(series, errors='coerce').fillna(0)
         return df[column]
 
     def _ensure_string_column(self, df: pd.DataFrame, column: str, default: str = '') -> pd.Series:
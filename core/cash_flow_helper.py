@@ -1,9 +1,21 @@
 # core/cash_flow_helper.py - 现金流计算辅助类
 import pandas as pd
-from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List
 import numpy as np
-import calendar
+
+# 付款阶段配置：(阶段名, 比例列, 时间列, 缺省时间规则)
+_STAGE_CONFIGS = (
+    ("首付款", "首付款比例", "首付款时间", "start"),
+    ("次付款", "次付款比例", "次付款时间", "delivery"),
+    ("尾款", "尾款比例", "尾款时间", "delivery_plus_one"),
+    ("质保金", "质保金比例", "质保金时间", "delivery_plus_one"),
+)
+
+# 现金流明细输出列
+_CASH_FLOW_COLUMNS = ["项目名称", "业务线", "现金流类型", "金额", "支付日期", "支付月份", "付款比例"]
+
+# 交付后一个月（严格按自然月推进），避免每次调用重新构造 DateOffset
+_ONE_MONTH = pd.DateOffset(months=1)
 
 
 class CashFlowHelper:
@@ -29,19 +41,37 @@ class CashFlowHelper:
         if project_row.empty:
             return pd.DataFrame()
 
+        cash_flow_items = CashFlowHelper._collect_project_cash_flow_items(
+            project_row, revenue_column)
+        if not cash_flow_items:
+            return pd.DataFrame()
+
+        cash_flow_df = pd.DataFrame(cash_flow_items)
+        # 支付月份在汇总后整列格式化一次
+        cash_flow_df["支付月份"] = pd.to_datetime(
+            cash_flow_df["支付日期"], errors="coerce").dt.strftime('%Y-%m')
+        return cash_flow_df[_CASH_FLOW_COLUMNS]
+
+    @staticmethod
+    def _collect_project_cash_flow_items(
+        project_row: pd.Series,
+        revenue_column: str = "_final_amount"
+    ) -> List[dict]:
+        """收集单个项目各付款阶段的现金流记录
+
+        返回 dict 列表而非 DataFrame（不含支付月份），批量处理多个项目时由调用方
+        汇总后一次性构造 DataFrame 并整列格式化月份
+        """
+        # 先转为 dict，循环内的字段查找走 dict.get 而非 Series.get
+        project_row = project_row.to_dict()
         cash_flow_items = []
         revenue = CashFlowHelper._get_project_revenue(project_row, revenue_column)
+        fallback_dates = CashFlowHelper._fallback_dates(project_row)
 
-        stage_configs = [
-            ("首付款", "首付款比例", "首付款时间", "start"),
-            ("次付款", "次付款比例", "次付款时间", "delivery"),
-            ("尾款", "尾款比例", "尾款时间", "delivery_plus_one"),
-            ("质保金", "质保金比例", "质保金时间", "delivery_plus_one")
-        ]
-
-        for stage_name, ratio_col, time_col, fallback in stage_configs:
+        for stage_name, ratio_col, time_col, fallback in _STAGE_CONFIGS:
             ratio = CashFlowHelper._safe_float(project_row.get(ratio_col, 0))
-            payment_date = CashFlowHelper._resolve_payment_date(project_row, time_col, fallback)
+            payment_date = CashFlowHelper._resolve_payment_date(
+                project_row, time_col, fallback, fallback_dates)
 
             if ratio > 0 and payment_date and pd.notna(payment_date):
                 payment_amount = revenue * (ratio / 100)
@@ -52,11 +82,10 @@ class CashFlowHelper:
                         "现金流类型": stage_name,
                         "金额": payment_amount,
                         "支付日期": payment_date,
-                        "支付月份": CashFlowHelper._format_to_month(payment_date),
                         "付款比例": f"{ratio:.1f}%"
                     })
 
-        return pd.DataFrame(cash_flow_items)
+        return cash_flow_items
 
     @staticmethod
     def calculate_dataframe_cash_flow(
@@ -75,32 +104,59 @@ class CashFlowHelper:
         if df.empty:
             return pd.DataFrame()
 
-        working_df = df.copy()
-        revenue_column = CashFlowHelper._ensure_revenue_column(working_df, revenue_column)
-        all_cash_flows = []
+        # 只读原表，不整表复制；收入列单独数值化
+        revenue = CashFlowHelper._revenue_series(df, revenue_column)
+
+        # 收入 <= 0 的项目不会产生现金流，先用掩码整体过滤，缩小后续计算规模
+        has_revenue = (revenue > 0).to_numpy()
+        if not has_revenue.any():
+            return pd.DataFrame(columns=_CASH_FLOW_COLUMNS)
+        if not has_revenue.all():
+            df = df[has_revenue]
+            revenue = revenue[has_revenue]
+        positions = np.arange(len(df))
+
+        # 回退日期整列计算一次：开始时间 / 交付时间 / 交付时间 + 1 个月
+        delivery_time = CashFlowHelper._date_column(df, "交付时间")
+        fallback_dates = {
+            "start": CashFlowHelper._date_column(df, "开始时间"),
+            "delivery": delivery_time,
+            "delivery_plus_one": delivery_time + _ONE_MONTH,
+        }
 
-        # 遍历每个项目
-        for _, project in working_df.iterrows():
-            # 跳过无效数据
-            if CashFlowHelper._get_project_revenue(project, revenue_column) == 0:
+        # 每个付款阶段一次整列运算
+        customer = CashFlowHelper._column_or_default(df, "客户", "").to_numpy()
+        business_line = CashFlowHelper._column_or_default(df, "业务线", "").to_numpy()
+        stage_frames = []
+        for stage_name, ratio_col, time_col, fallback in _STAGE_CONFIGS:
+            ratio = pd.to_numeric(
+                CashFlowHelper._column_or_default(df, ratio_col, 0),
+                errors="coerce").fillna(0)
+            payment_date = CashFlowHelper._date_column(df, time_col)
+            payment_date = payment_date.where(payment_date.notna(), fallback_dates[fallback])
+            amount = revenue * (ratio / 100)
+
+            valid = ((ratio > 0) & payment_date.notna() & (amount > 0)).to_numpy()
+            if not valid.any():
                 continue
 
-            # 计算单个项目的现金流
-            project_cash_flow = CashFlowHelper.calculate_single_project_cash_flow(
-                project, revenue_column)
+            stage_frames.append(pd.DataFrame({
+                "项目名称": customer[valid],
+                "业务线": business_line[valid],
+                "现金流类型": stage_name,
+                "金额": amount.to_numpy()[valid],
+                "支付日期": payment_date.to_numpy()[valid],
+                "付款比例": ratio[valid].map("{:.1f}%".format).to_numpy(),
+            }, index=positions[valid]))
 
-            if not project_cash_flow.empty:
-                all_cash_flows.append(project_cash_flow)
+        if not stage_frames:
+            return pd.DataFrame(columns=_CASH_FLOW_COLUMNS)
 
-        # 合并所有现金流
-        if all_cash_flows:
-            return pd.concat(all_cash_flows, ignore_index=True)
-        else:
-            return pd.DataFrame(
-                columns=[
-                    "项目名称", "业务线", "现金流类型", "金额", "支付日期", "支付月份",
-                    "付款比例"
-                ])
+        # 按原始项目顺序排列（同一项目内保持阶段顺序）
+        cash_flow_df = pd.concat(stage_frames).sort_index(kind="stable")
+        cash_flow_df["支付月份"] = cash_flow_df["支付日期"].dt.strftime('%Y-%m')
+
+        return cash_flow_df[_CASH_FLOW_COLUMNS].reset_index(drop=True)
 
     @staticmethod
     def calculate_monthly_summary(cash_flow_df: pd.DataFrame) -> pd.DataFrame:
@@ -112,35 +168,29 @@ class CashFlowHelper:
         if cash_flow_df.empty:
             return pd.DataFrame(columns=["月份", "月度现金流", "项目数量", "支付月份"])
 
-        working_df = cash_flow_df.copy()
+        working_df = cash_flow_df
 
-        # 确保存在支付月份（明细现金流通常用支付月份）
-        if "支付月份" not in working_df.columns or working_df["支付月份"].isna().all():
-            working_df["支付月份"] = pd.to_datetime(
+        # 确保存在支付月份（明细现金流通常用支付月份）；仅在需要补列时才生成新表
+        needs_month = (
+            "支付月份" not in working_df.columns
+            or not working_df["支付月份"].notna().any()
+        )
+        if needs_month:
+            working_df = working_df.assign(支付月份=pd.to_datetime(
                 working_df.get("支付日期", None), errors="coerce"
-            ).dt.to_period("M").astype(str)
+            ).dt.to_period("M").astype(str))
 
-        monthly_summary = (
-            working_df.dropna(subset=["支付月份"])
-            .groupby("支付月份")
-            .agg({"金额": "sum", "项目名称": "nunique"})
-            .reset_index()
-        )
+        monthly_summary = CashFlowHelper._sum_and_count_projects(
+            working_df.dropna(subset=["支付月份"]), "支付月份", sort=False)
 
-        # 统一列名：预测/汇总统一用“月份”
-        monthly_summary = monthly_summary.rename(
-            columns={
-                "支付月份": "月份",
-                "项目名称": "项目数量",
-                "金额": "月度现金流",
-            }
-        )
+        # 统一列名：预测/汇总统一用“月份”（列顺序固定，直接赋值免去 rename 复制）
+        monthly_summary.columns = ["月份", "月度现金流", "项目数量"]
 
         # 兼容：保留旧列名，避免外部调用依赖“支付月份”
         monthly_summary["支付月份"] = monthly_summary["月份"]
 
         # 按月份排序
-        monthly_summary = monthly_summary.sort_values("月份")
+        monthly_summary = monthly_summary.sort_values("月份", ignore_index=True)
 
         return monthly_summary[["月份", "月度现金流", "项目数量", "支付月份"]]
 
@@ -159,15 +209,9 @@ class CashFlowHelper:
             return pd.DataFrame(columns=["业务线", "现金流", "项目数量"])
 
         # 按业务线汇总
-        summary = cash_flow_df.groupby("业务线").agg({
-            "金额": "sum",
-            "项目名称": "nunique"
-        }).reset_index()
-
-        summary = summary.rename(columns={
-            "项目名称": "项目数量",
-            "金额": "现金流"
-        })
+        summary = CashFlowHelper._sum_and_count_projects(cash_flow_df, "业务线", sort=False)
+
+        summary.columns = ["业务线", "现金流", "项目数量"]
 
         # 按现金流排序
         summary = summary.sort_values("现金流", ascending=False)
@@ -188,18 +232,33 @@ class CashFlowHelper:
             return pd.DataFrame(columns=["付款阶段", "金额", "项目数量"])
 
         # 按付款阶段汇总
-        summary = cash_flow_df.groupby("现金流类型").agg({
-            "金额": "sum",
-            "项目名称": "nunique"
-        }).reset_index()
-
-        summary = summary.rename(columns={
-            "现金流类型": "付款阶段",
-            "项目名称": "项目数量"
-        })
+        summary = CashFlowHelper._sum_and_count_projects(cash_flow_df, "现金流类型")
+
+        summary.columns = ["付款阶段", "金额", "项目数量"]
 
         return summary
 
+    @staticmethod
+    def _sum_and_count_projects(
+        cash_flow_df: pd.DataFrame,
+        key: str,
+        sort: bool = True
+    ) -> pd.DataFrame:
+        """按 key 汇总金额并统计项目数
+
+        项目数先对 (key, 项目名称) 整体去重一次再按组计数，代替逐组哈希的 nunique；
+        调用方随后自行排序时传 sort=False 跳过分组键排序
+
+        Returns:
+            列为 [key, '金额', '项目数量'] 的DataFrame
+        """
+        summary = cash_flow_df.groupby(
+            key, sort=sort, observed=True)["金额"].sum().to_frame()
+        projects = cash_flow_df[[key, "项目名称"]].dropna().drop_duplicates()
+        summary["项目数量"] = projects.groupby(
+            key, sort=False, observed=True).size().reindex(summary.index, fill_value=0)
+        return summary.reset_index()
+
     @staticmethod
     def merge_with_original_df(
         original_df: pd.DataFrame,
@@ -222,22 +281,26 @@ class CashFlowHelper:
         merged_df = original_df.copy()
 
         # 为每个付款阶段添加计算列
-        stages = [("首付款", "首付款比例"), ("次付款", "次付款比例"),
-                  ("尾款", "尾款比例"), ("质保金", "质保金比例")]
-
-        for stage_name, ratio_col in stages:
-            stage_cash = cash_flow_df[cash_flow_df["现金流类型"] == stage_name]
-            if not stage_cash.empty:
-                # 按项目和业务线汇总
-                stage_summary = stage_cash.groupby(
-                    ["项目名称", "业务线"])["金额"].sum()
-
-                # 添加合并列
-                income_col = f"{stage_name}{stage_income_suffix}"
-                merged_df[income_col] = merged_df.apply(
-                    lambda row: stage_summary.get((row.get("客户", ""),
-                                                   row.get("业务线", "")), 0),
-                    axis=1)
+        # (客户, 业务线) 键整列构造一次，各阶段直接 reindex 取值
+        project_keys = pd.MultiIndex.from_arrays([
+            CashFlowHelper._column_or_default(merged_df, "客户", ""),
+            CashFlowHelper._column_or_default(merged_df, "业务线", ""),
+        ])
+
+        # 一次分组得到 (项目, 业务线) × 阶段 的金额透视表
+        stage_pivot = cash_flow_df.groupby(
+            ["项目名称", "业务线", "现金流类型"])["金额"].sum().unstack("现金流类型")
+
+        # 分组会丢掉项目名称/业务线为空的记录：只要阶段有现金流记录就输出该列，取不到的按 0
+        present_stages = set(cash_flow_df["现金流类型"].unique())
+        stage_names = [stage_name for stage_name, _, _, _ in _STAGE_CONFIGS if stage_name in present_stages]
+        stage_pivot = stage_pivot.reindex(columns=stage_names)
+
+        for stage_name in stage_names:
+            # 添加合并列
+            income_col = f"{stage_name}{stage_income_suffix}"
+            merged_df[income_col] = (
+                stage_pivot[stage_name].reindex(project_keys).fillna(0).to_numpy())
 
         return merged_df
 
@@ -254,21 +317,17 @@ class CashFlowHelper:
         if project_row.empty:
             return pd.DataFrame()
 
+        project_row = project_row.to_dict()
         payments = []
         revenue = CashFlowHelper._get_project_revenue(project_row)
         customer = project_row.get("客户", "")
         business_line = project_row.get("业务线", "")
+        fallback_dates = CashFlowHelper._fallback_dates(project_row)
 
-        stage_configs = [
-            ("首付款", "首付款比例", "首付款时间", "start"),
-            ("次付款", "次付款比例", "次付款时间", "delivery"),
-            ("尾款", "尾款比例", "尾款时间", "delivery_plus_one"),
-            ("质保金", "质保金比例", "质保金时间", "delivery_plus_one")
-        ]
-
-        for stage, ratio_col, date_col, fallback in stage_configs:
+        for stage, ratio_col, date_col, fallback in _STAGE_CONFIGS:
             ratio = project_row.get(ratio_col, 0)
-            payment_date = CashFlowHelper._resolve_payment_date(project_row, date_col, fallback)
+            payment_date = CashFlowHelper._resolve_payment_date(
+                project_row, date_col, fallback, fallback_dates)
 
             if ratio > 0:
                 amount = revenue * (ratio / 100)
@@ -314,13 +373,11 @@ class CashFlowHelper:
                 columns=["月份", "预测现金流", "累计现金流"])
 
         # 从当前月份开始生成未来月份
-        from datetime import datetime
-        current_month = datetime.now().replace(day=1)
+        current_month = pd.Timestamp.now().normalize().replace(day=1)
 
-        future_months = []
-        for i in range(months_ahead):
-            month = CashFlowHelper._add_months(current_month, i)
-            future_months.append(month.strftime('%Y-%m'))
+        future_months = pd.date_range(
+            start=current_month, periods=months_ahead, freq="MS"
+        ).strftime('%Y-%m').tolist()
 
         # 获取现有现金流数据
         monthly_cash = CashFlowHelper.calculate_monthly_summary(cash_flow_df)
@@ -341,7 +398,7 @@ class CashFlowHelper:
             all_months["预测现金流"] = 0
 
         # 计算累计现金流
-        all_months["累计现金流"] = all_months["预测现金流"].cumsum()
+        all_months["累计现金流"] = np.cumsum(all_months["预测现金流"].to_numpy())
 
         # 如果设置了，删除现金流为0的月份
         if not fill_zero_months:
@@ -350,8 +407,8 @@ class CashFlowHelper:
         return all_months[["月份", "预测现金流", "累计现金流"]]
 
     @staticmethod
-    def _ensure_revenue_column(df: pd.DataFrame, preferred_column: Optional[str] = None) -> str:
-        """确定可用的收入列并进行数值化"""
+    def _revenue_series(df: pd.DataFrame, preferred_column: Optional[str] = None) -> pd.Series:
+        """确定可用的收入列并返回数值化后的整列（不修改原 DataFrame）"""
         candidates: List[str] = []
         if preferred_column:
             candidates.append(preferred_column)
@@ -359,11 +416,22 @@ class CashFlowHelper:
 
         for column in candidates:
             if column and column in df.columns:
-                df[column] = pd.to_numeric(df[column], errors="coerce").fillna(0)
-                return column
+                return pd.to_numeric(df[column], errors="coerce").fillna(0)
+
+        return pd.Series(0.0, index=df.index)
 
-        df["_final_amount"] = 0.0
-        return "_final_amount"
+    @staticmethod
+    def _column_or_default(df: pd.DataFrame, column: str, default) -> pd.Series:
+        """取整列数据，列不存在时返回同索引的默认值列"""
+        if column in df.columns:
+            return df[column]
+        return pd.Series(default, index=df.index)
+
+    @staticmethod
+    def _date_column(df: pd.DataFrame, column: str) -> pd.Series:
+        """整列转换为日期，无法解析或列不存在时为 NaT"""
+        return pd.to_datetime(
+            CashFlowHelper._column_or_default(df, column, pd.NaT), errors="coerce")
 
     @staticmethod
     def _get_project_revenue(project_row: pd.Series, preferred_column: Optional[str] = None) -> float:
@@ -386,55 +454,50 @@ class CashFlowHelper:
     @staticmethod
     def _safe_float(value) -> float:
         """安全地转换为浮点数"""
+        if type(value) is float:
+            return value
         try:
             if value in (None, ""):
                 return 0.0
             return float(value)
         except Exception:
+            # pd.NA 等无法判断真假或无法转换的值
             return 0.0
 
     @staticmethod
-    def _format_to_month(date_value) -> str:
-        """格式化日期为月份字符串"""
-        if pd.isna(date_value):
-            return ""
-
-        if isinstance(date_value, (pd.Timestamp, datetime)):
-            return date_value.strftime('%Y-%m')
-
-        if isinstance(date_value, str):
-            if '-' in date_value and len(date_value) >= 7:
-                return date_value[:7]  # 取年月部分
-
-        return str(date_value)[:7] if str(date_value) else ""
-
-    @staticmethod
-    def _resolve_payment_date(project_row: pd.Series, explicit_col: str, fallback: str):
-        """优先使用明细字段，否则根据规则推导付款时间"""
+    def _resolve_payment_date(
+        project_row: pd.Series,
+        explicit_col: str,
+        fallback: str,
+        fallback_dates: Optional[Dict[str, Any]] = None
+    ):
+        """优先使用明细字段，否则根据规则推导付款时间
+
+        fallback_dates 为 _fallback_dates 的结果，同一项目的多个阶段共用一份，
+        避免逐阶段重复读取并推算开始/交付时间
+        """
         explicit_value = project_row.get(explicit_col)
         if pd.notna(explicit_value):
             return explicit_value
 
-        start_time = project_row.get("开始时间")
-        delivery_time = project_row.get("交付时间")
-
-        if fallback == "start":
-            return start_time
-        if fallback == "delivery":
-            return delivery_time
-        if fallback == "delivery_plus_one" and pd.notna(delivery_time):
-            return delivery_time + pd.DateOffset(months=1)
+        if fallback_dates is None:
+            fallback_dates = CashFlowHelper._fallback_dates(project_row)
+        if fallback in fallback_dates:
+            return fallback_dates[fallback]
 
         return explicit_value
 
     @staticmethod
-    def _add_months(date: datetime, months: int) -> datetime:
-        """添加月份"""
-        month = date.month - 1 + months
-        year = date.year + month // 12
-        month = month % 12 + 1
-        day = min(date.day, calendar.monthrange(year, month)[1])
-        return date.replace(year=year, month=month, day=day)
+    def _fallback_dates(project_row: pd.Series) -> Dict[str, Any]:
+        """推导单个项目各缺省时间规则对应的付款时间"""
+        delivery_time = project_row.get("交付时间")
+        fallback_dates = {
+            "start": project_row.get("开始时间"),
+            "delivery": delivery_time,
+        }
+        if pd.notna(delivery_time):
+            fallback_dates["delivery_plus_one"] = delivery_time + _ONE_MONTH
+        return fallback_dates
 
     @staticmethod
     def calculate_runway(
@@ -480,22 +543,10 @@ class CashFlowHelper:
         })
 
         # 计算累计现金余额
-        monthly_summary["累计现金余额"] = initial_cash
-        for i in range(len(monthly_summary)):
-            if i == 0:
-                monthly_summary.loc[i, "累计现金余额"] = initial_cash + monthly_summary.loc[i, "净现金流"]
-            else:
-                monthly_summary.loc[i, "累计现金余额"] = (
-                    monthly_summary.loc[i - 1, "累计现金余额"] +
-                    monthly_summary.loc[i, "净现金流"]
-                )
-
-        # 计算Runway
-        runway_months = 0
-        for i, row in monthly_summary.iterrows():
-            if row["累计现金余额"] <= 0:
-                break
-            runway_months += 1
+        monthly_summary["累计现金余额"] = initial_cash + monthly_summary["净现金流"].cumsum()
+
+        # 计算Runway：余额首次 <= 0 之前的连续月数
+        runway_months = int((monthly_summary["累计现金余额"] > 0).cummin().sum())
 
         return {
             "runway_months": runway_months,
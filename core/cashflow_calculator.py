@@ -13,7 +13,7 @@ class CashFlowCalculator:
 
     设计原则：
     - core 层只做“纯计算”，不直接依赖 data 层
-    - 所有“按月推进”的逻辑统一走 CashFlowHelper._add_months（严格按月，避免 timedelta(days=30*i) 漂移）
+    - 所有“按月推进”的逻辑统一走自然月序列（pd.date_range(freq="MS")，严格按月，避免 timedelta(days=30*i) 漂移）
     - 对外提供稳定接口，便于 pages 逐步迁移
     """
 
@@ -1,12 +1,36 @@
 # core/config_manager.py - 统一配置管理器 (修正版)
+import copy
 import json
 import os
+import re
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Optional, List, Tuple, Union
+from typing import Any, Dict, Iterator, Optional, List, Tuple, Union
 
 import pandas as pd
 import streamlit as st
 
+# 非字母数字字符（含下划线）；\w 与 str.isalnum 对 Unicode 的判定一致，中文保留
+_NON_ALNUM_RE = re.compile(r"[\W_]")
+
+
+@lru_cache(maxsize=8)
+def _read_config_file(path: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    """读取并解析配置文件
+
+    以 (路径, 修改时间, 大小) 为缓存键，文件未变化时直接复用已解析的结果
+    """
+    return json.loads(Path(path).read_bytes())
+
+
+@lru_cache(maxsize=8)
+def _month_options(year_start: int, year_end: int) -> Tuple[Tuple[str, ...], Dict[str, int]]:
+    """生成 YYYY-MM 月份选项及 月份→下标 的映射（同一年份范围只生成一次）"""
+    options = tuple(
+        f"{y}-{m:02d}" for y in range(year_start, year_end + 1) for m in range(1, 13))
+    return options, {month: idx for idx, month in enumerate(options)}
+
 
 class ConfigManager:
     """统一配置管理器
@@ -24,6 +48,9 @@ class ConfigManager:
 
     def __init__(self, config_file: str = "config/app_config.json"):
         self.config_file = config_file
+        # batch_updates() 期间暂停自动保存，仅记录是否有待落盘的修改
+        self._suspend_save = False
+        self._dirty = False
         self.default_config = self._get_default_config()
         self.current_config = self._load_config()
 
@@ -112,8 +139,10 @@ class ConfigManager:
         """加载配置文件"""
         try:
             if os.path.exists(self.config_file):
-                with open(self.config_file, "r", encoding="utf-8") as f:
-                    config = json.load(f)
+                stat = os.stat(self.config_file)
+                # 缓存的解析结果是共享的，深拷贝后再交给可变的 current_config
+                config = copy.deepcopy(
+                    _read_config_file(self.config_file, stat.st_mtime_ns, stat.st_size))
                 # 合并默认配置和当前配置，确保新增字段不会丢
                 return self._merge_config(self.default_config, config)
             return self.default_config.copy()
@@ -122,13 +151,25 @@ class ConfigManager:
             return self.default_config.copy()
 
     def _merge_config(self, default: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
-        """合并配置（递归更新）"""
-        result = default.copy()
-        for key, value in current.items():
-            if key in result and isinstance(result[key], dict) and isinstance(value, dict):
-                result[key] = self._merge_config(result[key], value)
-            else:
-                result[key] = value
+        """合并配置（current 覆盖 default，嵌套 dict 逐层合并）
+
+        入口处对 default 深拷贝一次，之后用显式栈原地合并，不再逐层复制。
+        current 与 default 完全相同时（首次保存后的常见情况）直接返回 current，
+        调用方传入的 current 已是独立副本。
+        """
+        if current == default:
+            return current
+
+        result = copy.deepcopy(default)
+        stack = [(result, current)]
+        while stack:
+            target, source = stack.pop()
+            for key, value in source.items():
+                existing = target.get(key)
+                if type(value) is dict and type(existing) is dict:
+                    stack.append((existing, value))
+                else:
+                    target[key] = value
         return result
 
     def get_config(self, category: str, key: Optional[str] = None) -> Any:
@@ -158,18 +199,55 @@ class ConfigManager:
             # 方式1：单个键值
             self.current_config[category][key_or_value] = value
 
-        # 自动保存
+        # 自动保存（批量更新期间延迟到退出时统一保存）
         if self.get_config("data", "auto_save"):
-            self.save_config()
+            if self._suspend_save:
+                self._dirty = True
+            else:
+                self.save_config(compact=True)
 
-    def save_config(self, config: Optional[Dict[str, Any]] = None) -> bool:
-        """保存配置到文件"""
+    def update_category(self, category: str, updates: Dict[str, Any]):
+        """合并更新某个分类下的多个键（只触发一次保存）"""
+        self.set_config(category, updates)
+
+    @contextmanager
+    def batch_updates(self) -> Iterator["ConfigManager"]:
+        """批量更新配置
+
+        上下文内的 set_config 只标记待保存，退出时统一落盘一次，
+        避免一次渲染中多个控件变化导致多次写盘。支持嵌套，以最外层为准。
+        """
+        if self._suspend_save:
+            yield self
+            return
+
+        self._suspend_save = True
+        try:
+            yield self
+        finally:
+            self._suspend_save = False
+            if self._dirty:
+                self._dirty = False
+                self.save_config(compact=True)
+
+    def save_config(self, config: Optional[Dict[str, Any]] = None, compact: bool = False) -> bool:
+        """保存配置到文件
+
+        compact=True 用于控件触发的自动保存：紧凑输出，不缩进；
+        手动保存/重置仍用 indent=2 便于阅读。先写临时文件再 os.replace，避免写一半的文件。
+        """
         try:
             if config is not None:
                 self.current_config = config
 
-            with open(self.config_file, "w", encoding="utf-8") as f:
-                json.dump(self.current_config, f, ensure_ascii=False, indent=2)
+            if compact:
+                text = json.dumps(self.current_config, ensure_ascii=False, separators=(",", ":"))
+            else:
+                text = json.dumps(self.current_config, ensure_ascii=False, indent=2)
+
+            tmp_file = f"{self.config_file}.tmp"
+            Path(tmp_file).write_bytes(text.encode("utf-8"))
+            os.replace(tmp_file, self.config_file)
             return True
         except Exception as e:
             st.error(f"保存配置文件失败: {str(e)}")
@@ -189,9 +267,10 @@ class ConfigManager:
     # UI helpers（统一 key + 自动持久化）
     # -----------------------------
     @staticmethod
+    @lru_cache(maxsize=64)
     def _safe_key(s: str) -> str:
-        # 将业务线等文本变成稳定、安全的 widget key
-        return "".join(ch if ch.isalnum() else "_" for ch in str(s))
+        # 将业务线等文本变成稳定、安全的 widget key（业务线集合很小，结果缓存）
+        return _NON_ALNUM_RE.sub("_", str(s))
 
     def render_forecast_config_ui(self, sidebar: bool = True) -> Dict[str, Any]:
         """渲染预测配置UI"""
@@ -246,17 +325,20 @@ class ConfigManager:
             key="cfg_forecast_auto_refresh",
         )
 
-        # 保存配置
+        # 保存配置（汇总变化后只写一次）
+        updates = {}
         if decay_lambda != config.get("decay_lambda"):
-            self.set_config("forecast", "decay_lambda", decay_lambda)
+            updates["decay_lambda"] = decay_lambda
         if base_offset != config.get("base_date_offset"):
-            self.set_config("forecast", "base_date_offset", base_offset)
+            updates["base_date_offset"] = base_offset
         if months_ahead != config.get("months_ahead"):
-            self.set_config("forecast", "months_ahead", months_ahead)
+            updates["months_ahead"] = months_ahead
         if show_stage_details != config.get("show_stage_details"):
-            self.set_config("forecast", "show_stage_details", show_stage_details)
+            updates["show_stage_details"] = show_stage_details
         if auto_refresh != config.get("auto_refresh"):
-            self.set_config("forecast", "auto_refresh", auto_refresh)
+            updates["auto_refresh"] = auto_refresh
+        if updates:
+            self.update_category("forecast", updates)
 
         return {
             "decay_lambda": decay_lambda,
@@ -305,12 +387,15 @@ class ConfigManager:
             key="cfg_cost_admin_cost_rate",
         )
 
+        updates = {}
         if material_rate != config.get("material_cost_rate"):
-            self.set_config("cost", "material_cost_rate", material_rate)
+            updates["material_cost_rate"] = material_rate
         if labor_rate != config.get("labor_cost_rate"):
-            self.set_config("cost", "labor_cost_rate", labor_rate)
+            updates["labor_cost_rate"] = labor_rate
         if admin_rate != config.get("admin_cost_rate"):
-            self.set_config("cost", "admin_cost_rate", admin_rate)
+            updates["admin_cost_rate"] = admin_rate
+        if updates:
+            self.update_category("cost", updates)
 
         return {
             "material_cost_rate": material_rate,
@@ -411,12 +496,12 @@ class ConfigManager:
         def _get(name: str, default: float) -> float:
             return float(current.get(name, default))
 
+        # 只建一次两列布局，每列上下放两个滑块，版面与两行两列相同
         col1, col2 = container.columns(2)
         first = col1.slider("首付款比例", 0, 100, int(_get("首付款比例", 50.0)), 1, key="cfg_payment_first")
         second = col2.slider("次付款比例", 0, 100, int(_get("次付款比例", 40.0)), 1, key="cfg_payment_second")
-        col3, col4 = container.columns(2)
-        final = col3.slider("尾款比例", 0, 100, int(_get("尾款比例", 0.0)), 1, key="cfg_payment_final")
-        warranty = col4.slider("质保金比例", 0, 100, int(_get("质保金比例", 10.0)), 1, key="cfg_payment_warranty")
+        final = col1.slider("尾款比例", 0, 100, int(_get("尾款比例", 0.0)), 1, key="cfg_payment_final")
+        warranty = col2.slider("质保金比例", 0, 100, int(_get("质保金比例", 10.0)), 1, key="cfg_payment_warranty")
 
         new_value = {
             "首付款比例": float(first),
@@ -451,11 +536,11 @@ class ConfigManager:
         current_start = str(cfg.get("start_month", default_start))
         current_end = str(cfg.get("end_month", default_end))
 
-        options = [f"{y}-{m:02d}" for y in range(year_range[0], year_range[1] + 1) for m in range(1, 13)]
+        options, option_index = _month_options(year_range[0], year_range[1])
 
         col1, col2 = container.columns(2)
-        start_idx = options.index(current_start) if current_start in options else options.index(default_start)
-        end_idx = options.index(current_end) if current_end in options else options.index(default_end)
+        start_idx = option_index[current_start] if current_start in option_index else option_index[default_start]
+        end_idx = option_index[current_end] if current_end in option_index else option_index[default_end]
 
         start_month = col1.selectbox("开始月份", options=options, index=start_idx, key=f"cfg_{category}_start_month")
         end_month = col2.selectbox("结束月份", options=options, index=end_idx, key=f"cfg_{category}_end_month")
@@ -464,10 +549,13 @@ class ConfigManager:
         if start_month > end_month:
             start_month, end_month = end_month, start_month
 
+        updates = {}
         if start_month != current_start:
-            self.set_config(category, "start_month", start_month)
+            updates["start_month"] = start_month
         if end_month != current_end:
-            self.set_config(category, "end_month", end_month)
+            updates["end_month"] = end_month
+        if updates:
+            self.update_category(category, updates)
 
         return start_month, end_month
 
@@ -488,10 +576,13 @@ class ConfigManager:
         new_cash = float(container.number_input("当前现金余额 (万元)", min_value=0.0, value=current_cash, step=1.0, key="cfg_cashflow_current_cash"))
         new_months = int(container.number_input("预测月份数", min_value=1, max_value=60, value=months_ahead, step=1, key="cfg_cashflow_months_ahead"))
 
+        updates = {}
         if new_cash != current_cash:
-            self.set_config("cashflow", "current_cash", new_cash)
+            updates["current_cash"] = new_cash
         if new_months != months_ahead:
-            self.set_config("cashflow", "months_ahead", new_months)
+            updates["months_ahead"] = new_months
+        if updates:
+            self.update_category("cashflow", updates)
 
         return {"current_cash": new_cash, "months_ahead": new_months}
 
@@ -537,14 +628,17 @@ class ConfigManager:
             key="cfg_display_color_palette",
         )
 
+        updates = {}
         if chart_height != config.get("chart_height"):
-            self.set_config("display", "chart_height", chart_height)
+            updates["chart_height"] = chart_height
         if table_page_size != config.get("table_page_size"):
-            self.set_config("display", "table_page_size", table_page_size)
+            updates["table_page_size"] = table_page_size
         if show_empty_categories != config.get("show_empty_categories"):
-            self.set_config("display", "show_empty_categories", show_empty_categories)
+            updates["show_empty_categories"] = show_empty_categories
         if color_palette != config.get("color_palette"):
-            self.set_config("display", "color_palette", color_palette)
+            updates["color_palette"] = color_palette
+        if updates:
+            self.update_category("display", updates)
 
         return {
             "chart_height": chart_height,
@@ -570,5 +664,15 @@ class ConfigManager:
         }
 
 
-# 全局配置管理器实例
-config_manager = ConfigManager()
\ No newline at end of file
+@st.cache_resource
+def get_config_manager() -> ConfigManager:
+    """获取全局配置管理器（跨 rerun 复用同一实例）"""
+    return ConfigManager()
+
+
+def __getattr__(name: str) -> Any:
+    # 全局配置管理器延迟到首次访问时创建，import 本模块不读写磁盘
+    # from core.config_manager import config_manager 仍然可用
+    if name == "config_manager":
+        return get_config_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,8 +1,17 @@
 # core/income_calculator.py - 修复版
 # 【修复】移除了对 data.data_service 的导入，符合 "core 不碰数据层" 的铁律
+import numpy as np
 import pandas as pd
 from typing import Dict, List
-import datetime
+from pandas.api.types import is_numeric_dtype
+
+# 四个付款阶段：(阶段名, 收入列名, 比例列名, 时间列名)
+_STAGE_COLUMNS = (
+    ('首付款', '首付款收入', '首付款比例', '首付款时间'),
+    ('次付款', '次付款收入', '次付款比例', '次付款时间'),
+    ('尾款', '尾款收入', '尾款比例', '尾款时间'),
+    ('质保金', '质保金收入', '质保金比例', '质保金时间'),
+)
 
 
 class IncomeCalculator:
@@ -25,103 +34,79 @@ class IncomeCalculator:
         if df.empty:
             return 0.0
 
-        working_df = df.copy()
-        revenue_col = self._ensure_revenue_column(working_df)
-        return working_df[revenue_col].sum()
+        return self._ensure_revenue_column(df).sum()
 
     def get_income_by_project(self, df: pd.DataFrame) -> pd.DataFrame:
         """基于DataFrame按项目获取收入明细（使用统一收入口径和四阶段配置）"""
         if df.empty:
             return pd.DataFrame()
 
-        working_df = df.copy()
-        revenue_col = self._ensure_revenue_column(working_df)
-        self._ensure_string_column(working_df, '客户')
-        self._ensure_string_column(working_df, '业务线')
-        contract_amount = self._ensure_numeric_column(working_df, '金额')
-        stage_rate = self._ensure_numeric_column(working_df, '成单率')
-        base_revenue = working_df[revenue_col]
-
-        income_by_project = pd.DataFrame({
-            '项目名称': working_df['客户'],
-            '业务线': working_df['业务线'],
+        base_revenue = self._ensure_revenue_column(df)
+        contract_amount = self._ensure_numeric_column(df, '金额')
+        stage_rate = self._ensure_numeric_column(df, '成单率')
+
+        # 四个阶段一次广播相乘：(N, 1) × (N, 4)
+        stage_income = base_revenue.to_numpy()[:, None] * (self._stage_ratio_matrix(df) / 100)
+
+        # 所有列先算好，一次构造 DataFrame，避免逐列插入
+        return pd.DataFrame({
+            '项目名称': self._ensure_string_column(df, '客户'),
+            '业务线': self._ensure_string_column(df, '业务线'),
             '合同金额': contract_amount,
             '纠偏后收入': base_revenue,
-            '成单率(%)': stage_rate
+            '成单率(%)': stage_rate,
+            **{label: stage_income[:, i] for i, (_, label, _, _) in enumerate(_STAGE_COLUMNS)},
+            '收入差异': base_revenue - contract_amount * (stage_rate / 100)
         })
 
-        stage_columns = [
-            ('首付款收入', '首付款比例'),
-            ('次付款收入', '次付款比例'),
-            ('尾款收入', '尾款比例'),
-            ('质保金收入', '质保金比例')
-        ]
-
-        for label, ratio_col in stage_columns:
-            ratio_series = self._ensure_numeric_column(working_df, ratio_col)
-            income_by_project[label] = base_revenue * (ratio_series / 100)
-
-        income_by_project['收入差异'] = income_by_project['纠偏后收入'] - (
-            income_by_project['合同金额'] * (income_by_project['成单率(%)'] / 100)
-        )
-
-        return income_by_project
-
     def get_income_forecast(self, df: pd.DataFrame, months_ahead: int = 12) -> pd.DataFrame:
         """基于DataFrame生成收入预测（使用付款时间配置）"""
         if df.empty:
             return pd.DataFrame()
 
-        working_df = df.copy()
-        self._ensure_revenue_column(working_df)
-        self._ensure_string_column(working_df, '客户')
-        self._ensure_string_column(working_df, '业务线')
-
-        forecast_data = []
-
-        stage_configs = [
-            ('首付款', '首付款比例', '首付款时间'),
-            ('次付款', '次付款比例', '次付款时间'),
-            ('尾款', '尾款比例', '尾款时间'),
-            ('质保金', '质保金比例', '质保金时间')
-        ]
-
-        for _, project in working_df.iterrows():
-            revenue = self._get_project_revenue(project)
-
-            for stage_name, ratio_col, time_col in stage_configs:
-                ratio = self._safe_float(project.get(ratio_col))
-                payment_time = project.get(time_col)
-
-                if ratio > 0 and pd.notna(payment_time):
-                    payment_amount = revenue * (ratio / 100)
-                    if payment_amount > 0:
-                        forecast_data.append({
-                            '项目名称': project.get('客户', ''),
-                            '业务线': project.get('业务线', ''),
-                            '收入类型': stage_name,
-                            '收入金额': payment_amount,
-                            '收入时间': payment_time,
-                            '收入月份': payment_time.strftime('%Y-%m') if isinstance(payment_time, (datetime.date, datetime.datetime, pd.Timestamp)) else '',
-                            '付款比例': f"{ratio:.1f}%"
-                        })
-
-        forecast_df = pd.DataFrame(forecast_data) if forecast_data else pd.DataFrame(
-            columns=['项目名称', '业务线', '收入类型', '收入金额', '收入时间', '收入月份', '付款比例']
-        )
+        customer = self._ensure_string_column(df, '客户').to_numpy()
+        business_line = self._ensure_string_column(df, '业务线').to_numpy()
+        revenue = self._ensure_revenue_column(df).to_numpy(dtype=float)
+        positions = np.arange(len(df))
+
+        # 每个阶段整列计算一次，再按 (项目, 阶段) 原顺序拼接
+        stage_frames = []
+        for stage_name, _, ratio_col, time_col in _STAGE_COLUMNS:
+            if time_col not in df.columns:
+                continue
+
+            ratio = self._ensure_numeric_column(df, ratio_col).to_numpy(dtype=float)
+            payment_time = pd.to_datetime(df[time_col], errors='coerce')
+
+            payment_amount = revenue * (ratio / 100)
+            valid = (ratio > 0) & payment_time.notna().to_numpy() & (payment_amount > 0)
+            if not valid.any():
+                continue
+
+            stage_time = payment_time[valid]
+            stage_frames.append(pd.DataFrame({
+                '项目名称': customer[valid],
+                '业务线': business_line[valid],
+                '收入类型': stage_name,
+                '收入金额': payment_amount[valid],
+                '收入时间': stage_time.to_numpy(),
+                '收入月份': stage_time.dt.strftime('%Y-%m').to_numpy(),
+                '付款比例': pd.Series(ratio[valid]).map("{:.1f}%".format).to_numpy()
+            }, index=positions[valid]))
+
+        if stage_frames:
+            forecast_df = pd.concat(stage_frames).sort_index(kind='stable').reset_index(drop=True)
+        else:
+            forecast_df = pd.DataFrame(
+                columns=['项目名称', '业务线', '收入类型', '收入金额', '收入时间', '收入月份', '付款比例']
+            )
 
         if not forecast_df.empty:
-            current_month = datetime.date.today().replace(day=1)
-            end_month = current_month
-            for _ in range(months_ahead):
-                end_month = end_month.replace(day=1) + datetime.timedelta(days=32)
-                end_month = end_month.replace(day=1)
-
-            forecast_df['收入月份_date'] = pd.to_datetime(forecast_df['收入月份'] + '-01', errors='coerce')
-            forecast_df = forecast_df[
-                (forecast_df['收入月份_date'] >= pd.to_datetime(current_month)) &
-                (forecast_df['收入月份_date'] <= pd.to_datetime(end_month))
-            ].drop('收入月份_date', axis=1)
+            # 窗口：本月至 months_ahead 个月后的那个月（含），直接比较收入时间
+            current_month = pd.Timestamp.today().normalize().replace(day=1)
+            window_end = current_month + pd.DateOffset(months=months_ahead + 1)
+            payment_time = forecast_df['收入时间']
+            forecast_df = forecast_df[(payment_time >= current_month) & (payment_time < window_end)]
 
         return forecast_df
 
@@ -130,43 +115,30 @@ class IncomeCalculator:
         if df.empty:
             return pd.DataFrame()
 
-        working_df = df.copy()
-        revenue_col = self._ensure_revenue_column(working_df)
-        base_revenue = working_df[revenue_col]
+        base_revenue = self._ensure_revenue_column(df)
+        ratios = self._stage_ratio_matrix(df)
 
-        stage_ratios = {
-            '首付款': self._ensure_numeric_column(working_df, '首付款比例'),
-            '次付款': self._ensure_numeric_column(working_df, '次付款比例'),
-            '尾款': self._ensure_numeric_column(working_df, '尾款比例'),
-            '质保金': self._ensure_numeric_column(working_df, '质保金比例')
-        }
+        # 一次广播相乘后按列求和，得到四个阶段的总收入
+        stage_income = (base_revenue.to_numpy()[:, None] * (ratios / 100)).sum(axis=0)
 
-        stages_data = {
-            '收入类型': [],
-            '总收入': [],
-            '项目数量': []
-        }
-
-        for stage_name, ratio_series in stage_ratios.items():
-            stage_income = (base_revenue * (ratio_series / 100)).sum()
-            stages_data['收入类型'].append(stage_name)
-            stages_data['总收入'].append(stage_income)
-            stages_data['项目数量'].append(int((ratio_series > 0).sum()))
-
-        return pd.DataFrame(stages_data)
+        return pd.DataFrame({
+            '收入类型': [stage_name for stage_name, _, _, _ in _STAGE_COLUMNS],
+            '总收入': stage_income,
+            '项目数量': (ratios > 0).sum(axis=0).astype(int)
+        })
 
     def get_income_by_business_line(self, df: pd.DataFrame) -> pd.DataFrame:
         """按业务线获取收入汇总"""
         if df.empty:
             return pd.DataFrame()
 
-        working_df = df.copy()
-        revenue_col = self._ensure_revenue_column(working_df)
-        self._ensure_string_column(working_df, '业务线')
-        self._ensure_string_column(working_df, '客户')
-        contract_amount = self._ensure_numeric_column(working_df, '金额')
-        working_df['__revenue_base'] = working_df[revenue_col]
-        working_df['金额'] = contract_amount
+        # 只取用到的四列组成小表，不复制整张 df
+        working_df = pd.DataFrame({
+            '业务线': self._ensure_string_column(df, '业务线'),
+            '__revenue_base': self._ensure_revenue_column(df),
+            '金额': self._ensure_numeric_column(df, '金额'),
+            '客户': self._ensure_string_column(df, '客户')
+        })
 
         income_by_line = working_df.groupby('业务线').agg({
             '__revenue_base': 'sum',
@@ -181,52 +153,40 @@ class IncomeCalculator:
         })
 
         income_by_line['收入差异'] = income_by_line['纠偏后收入'] - income_by_line['合同总额']
-        income_by_line['收入差异率'] = income_by_line.apply(
-            lambda row: round((row['收入差异'] / row['合同总额'] * 100), 2) if row['合同总额'] else 0,
-            axis=1
-        )
+        contract_total = income_by_line['合同总额'].to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            diff_rate = np.round(income_by_line['收入差异'].to_numpy() / contract_total * 100, 2)
+        income_by_line['收入差异率'] = np.where(contract_total != 0, diff_rate, 0.0)
 
         return income_by_line
 
-    def _ensure_revenue_column(self, df: pd.DataFrame) -> str:
-        """确定统一的收入列并转换为数值"""
+    def _ensure_revenue_column(self, df: pd.DataFrame) -> pd.Series:
+        """取统一口径的收入列（数值），不修改 df"""
         for column in ['_final_amount', '人工纠偏金额', '金额']:
             if column in df.columns:
-                self._ensure_numeric_column(df, column)
-                return column
+                return self._ensure_numeric_column(df, column)
 
-        df['_final_amount'] = 0.0
-        return '_final_amount'
+        return pd.Series(0.0, index=df.index)
 
     def _ensure_numeric_column(self, df: pd.DataFrame, column: str) -> pd.Series:
-        """确保列存在且为数值"""
+        """取数值列，列缺失时返回全 0，不修改 df"""
         if column not in df.columns:
-            df[column] = 0.0
-        df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0)
-        return df[column]
+            return pd.Series(0.0, index=df.index)
+        series = df[column]
+        if is_numeric_dtype(series) and not series.isna().any():
+            # 已是无缺失的数值列，无需重新转换
+            return series
+        return pd.to_numeric(series, errors='coerce').fillna(0)
+
+    def _stage_ratio_matrix(self, df: pd.DataFrame) -> np.ndarray:
+        """四个阶段的付款比例组成 (N, 4) 数组，列顺序同 _STAGE_COLUMNS"""
+        return np.column_stack([
+            self._ensure_numeric_column(df, ratio_col).to_numpy(dtype=float)
+            for _, _, ratio_col, _ in _STAGE_COLUMNS
+        ])
 
     def _ensure_string_column(self, df: pd.DataFrame, column: str, default: str = '') -> pd.Series:
-        """确保列存在且为字符串"""
+        """取字符串列，列缺失时返回 default，不修改 df"""
         if column not in df.columns:
-            df[column] = default
-        df[column] = df[column].fillna('').astype(str)
-        return df[column]
-
-    def _get_project_revenue(self, project_row: pd.Series) -> float:
-        """获取单条项目的收入基数"""
-        revenue = project_row.get('_final_amount', project_row.get('人工纠偏金额', project_row.get('金额', 0)))
-        try:
-            if revenue in (None, ''):
-                return 0.0
-            return float(revenue)
-        except Exception:
-            return 0.0
-
-    def _safe_float(self, value) -> float:
-        """安全地转换为浮点数"""
-        try:
-            if value in (None, ''):
-                return 0.0
-            return float(value)
-        except Exception:
-            return 0.0
\ No newline at end of file
+            return pd.Series(default, index=df.index, dtype=object)
+        return df[column].fillna('').astype(str)
@@ -175,7 +175,7 @@ class UnifiedCashFlowService:
         计算单个项目的现金流
         
         Args:
-            project_row: 项目数据行
+            project_row: 项目数据行（Series 或 dict 均可）
             revenue_column: 收入列名
         
         Returns:
@@ -266,7 +266,8 @@ class UnifiedCashFlowService:
         
         all_cash_flows = []
         
-        for _, row in df.iterrows():
+        # to_dict("records") 比 iterrows 轻量：不为每行构造 Series
+        for row in df.to_dict("records"):
             project_cash_flows = self.calculate_project_cash_flow(row, revenue_column)
             all_cash_flows.extend(project_cash_flows)
         
@@ -333,7 +334,7 @@ class UnifiedCashFlowService:
         candidates.extend(["_final_amount", "人工纠偏金额", "金额"])
         
         for column in candidates:
-            if column and column in project_row.index:
+            if column and column in project_row:
                 value = project_row.get(column)
                 if value not in (None, "") and pd.notna(value):
                     try:
@@ -9,12 +9,27 @@ from typing import Any, Dict, MutableMapping, Optional
 import numpy as np
 import pandas as pd
 
-from core.config_manager import config_manager
+from core.config_manager import get_config_manager
 from data.data_service import SalesDataService
 from data.override_service import OverrideService
 from data.schema import DataSchema
 from utils.validators import DataValidator, get_default_validator
 
+# 成单率文本中的整数（如 "50%-80%" 中的 50 和 80）
+_RATE_RE = re.compile(r"\d+")
+
+
+def _parse_rate_value(r):
+    if isinstance(r, (int, float)):
+        return r
+    if isinstance(r, str):
+        total = cnt = 0
+        for m in _RATE_RE.finditer(r):
+            total += int(m.group())
+            cnt += 1
+        return total / cnt if cnt else 0
+    return 0
+
 
 class DataManager:
     _instance = None
@@ -156,6 +171,27 @@ class DataManager:
         parsed = parsed.where(parsed.isna() | ((parsed >= 0) & (parsed <= 100)))
         return parsed
 
+    @staticmethod
+    def _parse_rate_mean(series: pd.Series) -> pd.Series:
+        """
+        首页展示用的成单率 _rate：
+        - 数值原样保留；文本取其中所有整数的平均值（"50%-80%" -> 65），解析不出为 0
+        - 取值大量重复（如 "10%-30%"），只对去重后的取值逐个解析再按编码回填
+        """
+        if pd.api.types.is_numeric_dtype(series):
+            return series
+        try:
+            codes, uniques = pd.factorize(series)
+        except TypeError:
+            # 含 list 等不可哈希的值时逐行解析
+            return series.apply(_parse_rate_value)
+        rates = np.array([_parse_rate_value(u) for u in uniques] + [0], dtype=float)[codes]
+        # 缺失值（编码 -1）按原值逐个解析：NaN 保持 NaN，None 等为 0
+        na_pos = np.flatnonzero(codes == -1)
+        if na_pos.size:
+            rates[na_pos] = [_parse_rate_value(v) for v in series.iloc[na_pos]]
+        return pd.Series(rates, index=series.index)
+
     def _compute_time_decay_factor(self, df: pd.DataFrame) -> pd.Series:
         """
         根据配置的时间衰减系数 λ 和基准日期，计算每一行的衰减因子。
@@ -164,7 +200,7 @@ class DataManager:
         if df.empty:
             return pd.Series([], dtype="float64")
 
-        forecast_cfg = config_manager.get_config("forecast") or {}
+        forecast_cfg = get_config_manager().get_config("forecast") or {}
         decay_lambda = forecast_cfg.get("decay_lambda", 0.0) or 0.0
         base_offset = forecast_cfg.get("base_date_offset", 0) or 0
 
@@ -269,6 +305,12 @@ class DataManager:
         result["交付月份"] = result["_交付月份"]
         # ============ 结束 ============
 
+        # 首页展示用的成单率：随数据加载算一次，页面重跑时直接复用
+        if "成单率" in result.columns:
+            result["_rate"] = self._parse_rate_mean(result["成单率"])
+        else:
+            result["_rate"] = 0
+
         if "_final_amount" not in result.columns:
             raise RuntimeError("DataManager 输出必须包含 _final_amount")
 
@@ -390,6 +432,15 @@ class DataManager:
             return False
         return self._compute_hash(s["edited_data"]) != s.get("data_hash")
 
+    def refresh_data(self, state: Optional[MutableMapping[str, Any]] = None) -> pd.DataFrame:
+        """强制从飞书重新加载数据"""
+        return self.get_active_data(force_reload=True, state=state)
+
+    def last_refresh_timestamp(self, state: Optional[MutableMapping[str, Any]] = None) -> Optional[str]:
+        """当前会话数据的版本（加载或保存时更新），可作为派生结果的缓存键"""
+        self._init_state(state)
+        return self._state(state).get("data_version")
+
     def get_data_info(self, state: Optional[MutableMapping[str, Any]] = None) -> Dict[str, Any]:
         self._init_state(state)
         s = self._state(state)
@@ -1,6 +1,9 @@
 # data/feishu_client.py
+import queue
 import requests
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 
 class FeishuClient:
@@ -10,19 +13,37 @@ class FeishuClient:
         self.app_token = app_token
         self._tenant_access_token = None
         self._token_expire_time = 0
+        # 客户端会被多个线程同时使用：token 刷新加锁，只刷新一次
+        self._token_lock = threading.Lock()
+        # 空闲会话池：会话长期复用，保持连接（keep-alive），省去每次请求的 TCP/TLS 握手
+        self._idle_sessions = queue.SimpleQueue()
+
+    def _request(self, method: str, url: str, **kwargs):
+        """借一个空闲会话发请求，用完放回（requests.Session 不保证线程安全，同一时刻只给一个线程用）"""
+        try:
+            session = self._idle_sessions.get_nowait()
+        except queue.Empty:
+            session = requests.Session()
+        try:
+            return session.request(method, url, **kwargs)
+        finally:
+            self._idle_sessions.put(session)
 
     def _get_tenant_access_token(self):
         if not self._tenant_access_token or time.time() >= self._token_expire_time:
-            url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
-            resp = requests.post(url, json={
-                "app_id": self.app_id,
-                "app_secret": self.app_secret
-            })
-            data = resp.json()
-            if "tenant_access_token" not in data:
-                raise Exception(f"Failed to get tenant_access_token: {data}")
-            self._tenant_access_token = data["tenant_access_token"]
-            self._token_expire_time = time.time() + data.get("expire", 7200) - 60
+            with self._token_lock:
+                # 等锁期间可能已被其他线程刷新
+                if not self._tenant_access_token or time.time() >= self._token_expire_time:
+                    url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
+                    resp = self._request("post", url, json={
+                        "app_id": self.app_id,
+                        "app_secret": self.app_secret
+                    })
+                    data = resp.json()
+                    if "tenant_access_token" not in data:
+                        raise Exception(f"Failed to get tenant_access_token: {data}")
+                    self._tenant_access_token = data["tenant_access_token"]
+                    self._token_expire_time = time.time() + data.get("expire", 7200) - 60
         return self._tenant_access_token
 
     def get_records(self, table_id: str, page_size=100):
@@ -32,33 +53,55 @@ class FeishuClient:
         Returns:
             list: 记录列表，每个记录包含 record_id 和 fields。空表返回空列表 []
         """
-        headers = {"Authorization": f"Bearer {self._get_tenant_access_token()}"}
         records = []
-        page_token = None
+        for items in self.iter_record_pages(table_id, page_size):
+            records.extend(items)
+        return records
+
+    def iter_record_pages(self, table_id: str, page_size=100):
+        """
+        逐页获取表格记录
+        
+        拿到一页后立即在后台线程请求下一页，调用方处理当前页时下一页已在路上，
+        网络等待与数据解析重叠进行
         
-        while True:
-            params = {"page_size": page_size}
-            if page_token:
-                params["page_token"] = page_token
+        Yields:
+            list: 每页的记录列表（可能为空）
+        """
+        headers = {"Authorization": f"Bearer {self._get_tenant_access_token()}"}
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            data = self._fetch_record_page(table_id, headers, page_size, None)
+            while True:
+                has_more = data.get("has_more", False)
+                next_page = None
+                if has_more:
+                    next_page = executor.submit(
+                        self._fetch_record_page, table_id, headers, page_size, data.get("page_token")
+                    )
                 
-            url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{self.app_token}/tables/{table_id}/records"
-            resp = requests.get(url, headers=headers, params=params)
-            data = resp.json()
-            
-            if data.get("code") != 0:
-                raise Exception(f"Feishu API error: {data}")
-            
-            # 【修复】处理 items 为 None 的情况
-            items = data.get("data", {}).get("items")
-            if items is None:
-                items = []
-            records.extend(items)
-            
-            if not data.get("data", {}).get("has_more", False):
-                break
-            page_token = data["data"].get("page_token")
+                # 【修复】处理 items 为 None 的情况
+                yield data.get("items") or []
+                
+                if next_page is None:
+                    break
+                data = next_page.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _fetch_record_page(self, table_id: str, headers: dict, page_size, page_token):
+        """请求一页记录，返回响应中的 data 部分"""
+        params = {"page_size": page_size}
+        if page_token:
+            params["page_token"] = page_token
             
-        return records
+        url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{self.app_token}/tables/{table_id}/records"
+        resp = self._request("get", url, headers=headers, params=params)
+        data = resp.json()
+        
+        if data.get("code") != 0:
+            raise Exception(f"Feishu API error: {data}")
+        return data.get("data", {})
 
     def create_record(self, table_id: str, fields: dict):
         """
@@ -76,7 +119,7 @@ class FeishuClient:
             "Content-Type": "application/json"
         }
         url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{self.app_token}/tables/{table_id}/records"
-        resp = requests.post(url, headers=headers, json={"fields": fields})
+        resp = self._request("post", url, headers=headers, json={"fields": fields})
         data = resp.json()
         if data.get("code") != 0:
             raise Exception(f"Create record failed: {data}")
@@ -99,7 +142,7 @@ class FeishuClient:
             "Content-Type": "application/json"
         }
         url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{self.app_token}/tables/{table_id}/records/{record_id}"
-        resp = requests.put(url, headers=headers, json={"fields": fields})
+        resp = self._request("put", url, headers=headers, json={"fields": fields})
         data = resp.json()
         if data.get("code") != 0:
             raise Exception(f"Update record failed: {data}")
@@ -121,7 +164,7 @@ class FeishuClient:
             "Content-Type": "application/json"
         }
         url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{self.app_token}/tables/{table_id}/records/{record_id}"
-        resp = requests.delete(url, headers=headers)
+        resp = self._request("delete", url, headers=headers)
         data = resp.json()
         if data.get("code") != 0:
             raise Exception(f"Delete record failed: {data}")
@@ -143,8 +186,30 @@ class FeishuClient:
             "Content-Type": "application/json"
         }
         url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{self.app_token}/tables/{table_id}/records/batch_create"
-        resp = requests.post(url, headers=headers, json={"records": records})
+        resp = self._request("post", url, headers=headers, json={"records": records})
         data = resp.json()
         if data.get("code") != 0:
             raise Exception(f"Batch create records failed: {data}")
-        return [r["record_id"] for r in data.get("data", {}).get("records", [])]
\ No newline at end of file
+        return [r["record_id"] for r in data.get("data", {}).get("records", [])]
+
+    def batch_update_records(self, table_id: str, records: list):
+        """
+        批量更新记录
+        
+        Args:
+            table_id: 表格ID
+            records: 记录列表，每个记录是一个 {"record_id": ..., "fields": {...}} 字典
+            
+        Returns:
+            list: 更新后的记录数据列表
+        """
+        headers = {
+            "Authorization": f"Bearer {self._get_tenant_access_token()}",
+            "Content-Type": "application/json"
+        }
+        url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{self.app_token}/tables/{table_id}/records/batch_update"
+        resp = self._request("post", url, headers=headers, json={"records": records})
+        data = resp.json()
+        if data.get("code") != 0:
+            raise Exception(f"Batch update records failed: {data}")
+        return data.get("data", {}).get("records", [])
\ No newline at end of file
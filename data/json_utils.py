@@ -0,0 +1,34 @@
+# data/json_utils.py
+"""
+JSON 工具 - 飞书表中 JSON 文本字段的读写
+
+解析优先用 orjson（可选依赖，未安装或解析失败时用标准库 json）；
+序列化用标准库 json，写回飞书的文本格式（分隔符、NaN 写法）保持不变
+"""
+
+import json
+import re
+
+try:
+    import orjson
+    _ORJSON_AVAILABLE = True
+except ImportError:
+    _ORJSON_AVAILABLE = False
+
+# 19 位及以上的连续数字：可能超出 64 位整数范围，orjson 会解析成浮点数（丢精度）
+_LONG_DIGITS_RE = re.compile(r"\d{19}")
+
+
+def json_loads(text):
+    """解析JSON文本（orjson 不支持的 NaN、超大整数等交给标准库，结果与 json.loads 一致）"""
+    if _ORJSON_AVAILABLE and not (isinstance(text, str) and _LONG_DIGITS_RE.search(text)):
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(text)
+
+
+def json_dumps(data) -> str:
+    """序列化为JSON字符串（中文不转义）"""
+    return json.dumps(data, ensure_ascii=False)
@@ -5,13 +5,19 @@
 """
 
 import streamlit as st
+import numpy as np
 import pandas as pd
-import json
+import threading
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, date
 from typing import Optional, List, Dict, Any, Tuple
 
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
 from config import FEISHU_APP_ID, FEISHU_APP_SECRET, FEISHU_APP_TOKEN, SALES_TABLES
 from data.feishu_client import FeishuClient
+from data.json_utils import json_loads, json_dumps
 
 
 # ========== 表ID配置 ==========
@@ -29,16 +35,35 @@ TABLE_LEADS = get_table_id("TABLE_MARKETING_LEADS", "tbljmAbFuOJZcWNe")        #
 TABLE_ACCOUNTS = get_table_id("TABLE_MARKETING_ACCOUNTS", "tblykWLUiH6w5RnC")  # 账号运营表
 
 
+# ========== 并发IO ==========
+# 相互独立的飞书请求放到线程池并发发出，重叠网络往返
+_io_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="marketing_io")
+
+
+def _submit_io(fn, *args) -> Future:
+    """提交到IO线程池，并带上当前脚本上下文（线程内的 st.error 等仍能显示）"""
+    ctx = get_script_run_ctx()
+    
+    def run():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args)
+    
+    return _io_pool.submit(run)
+
+
 # ========== JSON工具函数 ==========
 def parse_json_field(value):
     """安全解析JSON字段，如果不是JSON则返回原始值"""
-    if not value:
+    # 每条记录都会调用：先用 type 精确判断 str/dict，子类才走 isinstance
+    if value is None:
         return {}
-    if isinstance(value, dict):
-        return value
-    if isinstance(value, str):
+    value_type = type(value)
+    if value_type is str or (value_type is not dict and isinstance(value, str)):
+        if not value:
+            return {}
         try:
-            parsed = json.loads(value)
+            parsed = json_loads(value)
             if isinstance(parsed, dict):
                 return parsed
             # 如果解析出来不是dict，返回包装的dict
@@ -46,6 +71,8 @@ def parse_json_field(value):
         except:
             # 不是有效JSON，返回包含原始文本的dict
             return {"_raw_text": value}
+    if value_type is dict or isinstance(value, dict):
+        return value if value else {}
     return {}
 
 
@@ -54,7 +81,7 @@ def to_json_string(data: dict) -> str:
     if not data:
         return ""
     try:
-        return json.dumps(data, ensure_ascii=False, indent=None)
+        return json_dumps(data)
     except:
         return ""
 
@@ -74,18 +101,47 @@ def extract_feishu_date(x):
     return x
 
 
-def parse_timestamp(v):
-    """解析时间戳为datetime"""
-    if v is None:
-        return pd.NaT
-    vn = pd.to_numeric(v, errors="coerce")
-    if pd.notna(vn):
-        if vn >= 1e12:
-            return pd.to_datetime(vn, unit="ms", errors="coerce")
-        if vn >= 1e9:
-            return pd.to_datetime(vn, unit="s", errors="coerce")
-        return pd.NaT
-    return pd.to_datetime(str(v).strip(), errors="coerce")
+def parse_feishu_dates(series: pd.Series) -> pd.Series:
+    """
+    整列解析飞书日期字段为datetime
+    dict/list 先取出其中的值；数值按毫秒（>=1e12）或秒（>=1e9）时间戳解析，更小的数值视为无效；
+    其余文本按日期字符串解析；带时区偏移的文本保留其本地时间（去掉时区）
+    """
+    values = series.astype(object)
+    nested = values.map(type).isin((dict, list))
+    if nested.any():
+        values = values.where(~nested, values[nested].map(extract_feishu_date))
+    
+    nums = pd.to_numeric(values, errors="coerce")
+    result = pd.Series(pd.NaT, index=series.index, dtype="datetime64[ns]")
+    
+    is_ms = nums >= 1e12
+    if is_ms.any():
+        result[is_ms] = pd.to_datetime(nums[is_ms], unit="ms", errors="coerce")
+    is_s = (nums >= 1e9) & ~is_ms
+    if is_s.any():
+        result[is_s] = pd.to_datetime(nums[is_s], unit="s", errors="coerce")
+    
+    is_text = nums.isna() & values.notna()
+    if is_text.any():
+        text = values[is_text].astype(str).str.strip()
+        try:
+            parsed = pd.to_datetime(text, format="mixed", errors="coerce")
+        except ValueError:
+            # 各单元格时区不同，无法整列解析，逐个解析
+            parsed = text.map(_parse_date_text)
+        if isinstance(parsed.dtype, pd.DatetimeTZDtype):
+            parsed = parsed.dt.tz_localize(None)
+        result[is_text] = parsed
+    return result
+
+
+def _parse_date_text(text: str):
+    """解析单个日期字符串，带时区的去掉时区（保留本地时间），无效时为 NaT"""
+    ts = pd.to_datetime(text, errors="coerce")
+    if pd.notna(ts) and ts.tzinfo is not None:
+        ts = ts.tz_localize(None)
+    return ts
 
 
 def format_date_display(dt) -> str:
@@ -126,53 +182,135 @@ def safe_sum(df: pd.DataFrame, col: str, default=0) -> float:
     """安全求和"""
     if df.empty or col not in df.columns:
         return default
-    return float(safe_numeric(df[col], default).sum())
+    # 直接在 ndarray 上 nansum，省去 fillna 生成的中间数组
+    values = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    total = np.nansum(values)
+    if default:
+        # 与 fillna(default) 一致：无法转换的值按 default 计
+        total += default * np.isnan(values).sum()
+    return float(total)
+
+
+# ========== 飞书表加载（带缓存） ==========
+@st.cache_resource
+def _get_feishu_client() -> FeishuClient:
+    """飞书客户端（进程内复用，连接和 token 跨 rerun 共享）"""
+    return FeishuClient(FEISHU_APP_ID, FEISHU_APP_SECRET, FEISHU_APP_TOKEN)
+
+
+def _expand_json_column(df: pd.DataFrame, fields_list: List[Dict], json_col: str) -> pd.DataFrame:
+    """
+    把JSON扩展字段整列展开为DataFrame列
+    只解析字符串/字典值（其余值解析结果都是空），扩展字段一次构造成表后按列并入；
+    与核心字段同名时，仅填充该记录没有此核心字段的行（不覆盖核心字段）
+    """
+    values = df[json_col]
+    parsed = values[values.map(type).isin((str, dict))].map(parse_json_field)
+    parsed = parsed[parsed.map(bool)]
+    if parsed.empty:
+        return df
+    
+    extra = pd.DataFrame(parsed.tolist(), index=parsed.index)
+    extra = extra[[c for c in extra.columns if c != "record_id" and not c.startswith("_")]]
+    
+    for col in extra.columns.intersection(df.columns):
+        has_core = pd.Series([col in f for f in fields_list], index=df.index)
+        df[col] = df[col].where(has_core, extra[col])
+    
+    new_cols = extra.columns.difference(df.columns, sort=False)
+    if len(new_cols) == 0:
+        return df
+    return pd.concat([df, extra[new_cols]], axis=1)
+
+
+def _build_table(
+    client: FeishuClient,
+    table_id: str,
+    date_cols: Tuple[str, ...] = (),
+    num_cols: Tuple[str, ...] = (),
+    json_col: str = "data"
+) -> pd.DataFrame:
+    """
+    加载飞书表数据，并解析JSON扩展字段
+    JSON字段中的key会被展开为DataFrame的列
+    同时保留原始data字段值
+    """
+    # 逐条记录直接按列收集（缺失为 NaN），再一次构造 DataFrame，省去 list-of-dict 的行转列；
+    # 按页消费，处理当前页时客户端已在后台请求下一页
+    fields_list = []
+    record_ids = []
+    columns: Dict[str, list] = {}
+    for page in client.iter_record_pages(table_id):
+        offset = len(fields_list)
+        n_rows = offset + len(page)
+        for column in columns.values():
+            column.extend([np.nan] * len(page))
+        for i, record in enumerate(page, offset):
+            fields = record.get("fields") or {}
+            fields_list.append(fields)
+            record_ids.append(record.get("record_id", ""))
+            for key, value in fields.items():
+                column = columns.get(key)
+                if column is None:
+                    column = columns[key] = [np.nan] * n_rows
+                column[i] = value
+    if not fields_list:
+        return pd.DataFrame()
+    
+    columns["record_id"] = record_ids
+    df = pd.DataFrame(columns)
+    
+    # 保留data字段原始值（用于显示脚本等纯文本内容），并展开JSON扩展字段
+    if json_col in df.columns:
+        df[f"_{json_col}_raw"] = df[json_col]
+        df = _expand_json_column(df, fields_list, json_col)
+    
+    # 处理日期列
+    for col in date_cols:
+        if col in df.columns:
+            df[col] = parse_feishu_dates(df[col])
+            df[f"{col}_显示"] = df[col].dt.strftime("%Y-%m-%d").fillna("")
+    
+    # 处理数值列
+    for col in num_cols:
+        if col in df.columns:
+            df[col] = safe_numeric(df[col])
+    
+    return df
+
+
+@st.cache_data(ttl=60, show_spinner=False)  # 缓存60秒
+def _load_table_cached(
+    _client: FeishuClient,
+    table_id: str,
+    date_cols: Tuple[str, ...],
+    num_cols: Tuple[str, ...],
+    json_col: str
+) -> pd.DataFrame:
+    """带缓存的 _build_table；加载失败时抛出异常，不会缓存失败结果"""
+    return _build_table(_client, table_id, date_cols, num_cols, json_col)
 
 
 # ========== 市场推广服务类 ==========
 class MarketingService:
     """市场推广数据服务 - JSON存储方案（带缓存）"""
     
+    # 需求产品到销售台账表的映射
+    PRODUCT_TABLE_MAP = {
+        "在线光谱仪": SALES_TABLES.get("光谱设备/服务"),
+        "配液设备": SALES_TABLES.get("配液设备"),
+        "自动化系统": SALES_TABLES.get("自动化项目"),
+    }
+    
+    # 飞书多维表格批量接口单次最多 500 条记录
+    BATCH_SIZE = 500
+    
     def __init__(self):
-        self.client = FeishuClient(FEISHU_APP_ID, FEISHU_APP_SECRET, FEISHU_APP_TOKEN)
-        # 缓存
-        self._cache = {}
-        self._cache_time = {}
-        self._cache_ttl = 60  # 缓存60秒
-    
-    def _get_cache_key(self, table_id: str) -> str:
-        return f"mkt_{table_id}"
-    
-    def _is_cache_valid(self, key: str) -> bool:
-        """检查缓存是否有效"""
-        if key not in self._cache:
-            return False
-        import time
-        if time.time() - self._cache_time.get(key, 0) > self._cache_ttl:
-            return False
-        return True
-    
-    def _set_cache(self, key: str, data: pd.DataFrame):
-        """设置缓存"""
-        import time
-        self._cache[key] = data.copy()
-        self._cache_time[key] = time.time()
-    
-    def _get_cache(self, key: str) -> Optional[pd.DataFrame]:
-        """获取缓存"""
-        if self._is_cache_valid(key):
-            return self._cache[key].copy()
-        return None
+        self.client = _get_feishu_client()
     
     def _clear_cache(self, table_id: str = None):
-        """清除缓存"""
-        if table_id:
-            key = self._get_cache_key(table_id)
-            self._cache.pop(key, None)
-            self._cache_time.pop(key, None)
-        else:
-            self._cache.clear()
-            self._cache_time.clear()
+        """清除缓存（st.cache_data 只能整体清除，table_id 仅为兼容保留）"""
+        _load_table_cached.clear()
     
     # ==================== 通用方法 ====================
     def _load_table_with_json(
@@ -183,61 +321,12 @@ class MarketingService:
         json_col: str = "data",
         use_cache: bool = True
     ) -> pd.DataFrame:
-        """
-        加载飞书表数据，并解析JSON扩展字段
-        JSON字段中的key会被展开为DataFrame的列
-        同时保留原始data字段值
-        """
-        # 检查缓存
-        cache_key = self._get_cache_key(table_id)
-        if use_cache:
-            cached = self._get_cache(cache_key)
-            if cached is not None:
-                return cached
-        
+        """加载飞书表数据并展开JSON扩展字段（见 _build_table），默认走 st.cache_data 缓存"""
+        args = (table_id, tuple(date_cols or ()), tuple(num_cols or ()), json_col)
         try:
-            records = self.client.get_records(table_id)
-            if not records:
-                return pd.DataFrame()
-            
-            data = []
-            for r in records:
-                fields = r.get("fields", {})
-                fields["record_id"] = r.get("record_id", "")
-                
-                # 保留data字段原始值（用于显示脚本等纯文本内容）
-                if json_col in fields:
-                    original_data = fields[json_col]
-                    fields[f"_{json_col}_raw"] = original_data  # 保留原始值
-                    
-                    # 解析JSON扩展字段
-                    json_data = parse_json_field(original_data)
-                    for k, v in json_data.items():
-                        if k not in fields and not k.startswith("_"):  # 避免覆盖核心字段
-                            fields[k] = v
-                
-                data.append(fields)
-            
-            df = pd.DataFrame(data)
-            
-            # 处理日期列
-            if date_cols:
-                for col in date_cols:
-                    if col in df.columns:
-                        df[col] = df[col].apply(extract_feishu_date).apply(parse_timestamp)
-                        df[f"{col}_显示"] = df[col].apply(format_date_display)
-            
-            # 处理数值列
-            if num_cols:
-                for col in num_cols:
-                    if col in df.columns:
-                        df[col] = safe_numeric(df[col])
-            
-            # 存入缓存
             if use_cache:
-                self._set_cache(cache_key, df)
-            
-            return df
+                return _load_table_cached(self.client, *args)
+            return _build_table(self.client, *args)
         except Exception as e:
             st.error(f"加载数据失败: {e}")
             return pd.DataFrame()
@@ -328,6 +417,26 @@ class MarketingService:
         except Exception as e:
             st.error(f"更新失败: {e}")
             return False
+    
+    def _batch_update_records(
+        self,
+        table_id: str,
+        record_ids: List[str],
+        core_data: Dict,
+        date_fields: List[str] = None
+    ) -> bool:
+        """将同一组字段批量写入多条记录"""
+        try:
+            fields = self._prepare_fields_with_json(core_data, None, date_fields)
+            records = [{"record_id": rid, "fields": fields} for rid in record_ids]
+            for start in range(0, len(records), self.BATCH_SIZE):
+                self.client.batch_update_records(table_id, records[start:start + self.BATCH_SIZE])
+            # 清除该表缓存
+            self._clear_cache(table_id)
+            return True
+        except Exception as e:
+            st.error(f"更新失败: {e}")
+            return False
 
     # ==================== 选题管理 ====================
     def get_topics(self, status: str = None) -> pd.DataFrame:
@@ -366,16 +475,21 @@ class MarketingService:
         df = self.get_topics()
         if df.empty:
             return []
-        options = []
-        for _, row in df.iterrows():
-            options.append({
-                "id": row.get("选题ID", ""),
-                "title": row.get("选题标题", ""),
-                "category": row.get("栏目类型", ""),
-                "record_id": row.get("record_id", ""),
-                "display": f"{row.get('选题ID', '')} - {row.get('选题标题', '')}"
-            })
-        return options
+        
+        def column(name: str) -> list:
+            return df[name].tolist() if name in df.columns else [""] * len(df)
+        
+        return [
+            {
+                "id": topic_id,
+                "title": title,
+                "category": category,
+                "record_id": record_id,
+                "display": f"{topic_id} - {title}"
+            }
+            for topic_id, title, category, record_id in zip(
+                column("选题ID"), column("选题标题"), column("栏目类型"), column("record_id"))
+        ]
 
     # ==================== 发布记录 ====================
     def get_posts(self, topic_id: str = None, platform: str = None) -> pd.DataFrame:
@@ -485,59 +599,69 @@ class MarketingService:
         if df.empty:
             return {}
         
-        result = {}
-        if "平台" in df.columns and "粉丝数" in df.columns:
-            for platform in df["平台"].unique():
-                pdf = df[df["平台"] == platform]
-                if "记录日期" in pdf.columns:
-                    pdf = pdf.sort_values("记录日期", ascending=False)
-                if not pdf.empty:
-                    latest = pdf.iloc[0]
-                    result[platform] = {
-                        "followers": int(latest.get("粉丝数", 0)),
-                        "new_fans": int(latest.get("new_fans", 0)),
-                        "date": latest.get("记录日期_显示", "")
-                    }
-        return result
+        if "平台" not in df.columns or "粉丝数" not in df.columns:
+            return {}
+        platform_order = df["平台"].unique()
+        
+        # 整表按日期倒序排一次（稳定排序，同日取原表靠前的行），再按平台各取第一行
+        if "记录日期" in df.columns:
+            df = df.sort_values("记录日期", ascending=False, kind="stable")
+        latest = df.groupby("平台", sort=False).head(1)
+        
+        n = len(latest)
+        new_fans = latest["new_fans"].tolist() if "new_fans" in latest.columns else [0] * n
+        dates = latest["记录日期_显示"].tolist() if "记录日期_显示" in latest.columns else [""] * n
+        by_platform = {
+            platform: {"followers": int(followers), "new_fans": int(fans), "date": date}
+            for platform, followers, fans, date in zip(
+                latest["平台"].tolist(), latest["粉丝数"].tolist(), new_fans, dates
+            )
+        }
+        # 按平台在原表中首次出现的顺序返回
+        return {p: by_platform[p] for p in platform_order if p in by_platform}
 
     # ==================== 线索同步到销售台账 ====================
+    @staticmethod
+    def _index_by_record_id(df: pd.DataFrame) -> pd.DataFrame:
+        """以 record_id 为索引（保留该列），之后按 record_id 取行走索引查找"""
+        return df.set_index("record_id", drop=False).rename_axis(None)
+    
     def sync_lead_to_sales(self, lead_record_id: str) -> Tuple[bool, str]:
         """将线索同步到对应的销售台账"""
         try:
-            leads_df = self.get_leads()
-            lead = leads_df[leads_df["record_id"] == lead_record_id]
-            
-            if lead.empty:
-                return False, "线索不存在"
-            lead = lead.iloc[0]
+            leads = self._index_by_record_id(self.get_leads())
+        except Exception as e:
+            return False, str(e)
+        return self._sync_leads(leads, [lead_record_id])[0]
+    
+    def _plan_lead_sync(
+        self, leads: pd.DataFrame, lead_record_id: str
+    ) -> Tuple[List[Tuple[str, Optional[str], Optional[Dict]]], Optional[str]]:
+        """生成单条线索要写入的台账记录 [(产品, 表ID, 字段)]，失败时返回错误信息"""
+        try:
+            try:
+                lead = leads.loc[[lead_record_id]].iloc[0]
+            except KeyError:
+                return [], "线索不存在"
             
             # 获取需求产品（从JSON的products字段）
             products = lead.get("products", [])
             if isinstance(products, str):
                 try:
-                    products = json.loads(products)
+                    products = json_loads(products)
                 except:
                     products = [products] if products else []
             
             if not products:
-                return False, "请先选择需求产品"
-            
-            # 产品到表的映射
-            product_table_map = {
-                "在线光谱仪": SALES_TABLES.get("光谱设备/服务"),
-                "配液设备": SALES_TABLES.get("配液设备"),
-                "自动化系统": SALES_TABLES.get("自动化项目"),
-            }
-            
-            synced = []
-            errors = []
+                return [], "请先选择需求产品"
             
+            entries = []
             for product in products:
                 product = str(product).strip()
-                table_id = product_table_map.get(product)
+                table_id = self.PRODUCT_TABLE_MAP.get(product)
                 
                 if not table_id:
-                    errors.append(f"产品'{product}'无对应表")
+                    entries.append((product, None, None))
                     continue
                 
                 # 构建销售台账数据
@@ -555,28 +679,85 @@ class MarketingService:
                     "客户来源": f"市场推广-{lead.get('platform', '')}",
                     "市场线索ID": lead_record_id,
                 }
-                
-                try:
-                    result = self.client.create_record(table_id, sales_data)
-                    if result:
-                        synced.append(product)
-                except Exception as e:
-                    errors.append(f"{product}: {e}")
-            
-            if synced:
-                # 更新线索状态
-                self.update_lead(lead_record_id, {"线索状态": "已同步"})
-                return True, f"已同步: {', '.join(synced)}"
-            return False, "; ".join(errors) if errors else "同步失败"
+                entries.append((product, table_id, sales_data))
+            return entries, None
             
         except Exception as e:
-            return False, str(e)
+            return [], str(e)
+    
+    def _sync_leads(self, leads: pd.DataFrame, lead_ids: List[str]) -> List[Tuple[bool, str]]:
+        """同步多条线索（leads 为按 record_id 索引的线索表），按 lead_ids 顺序返回结果"""
+        plans = [self._plan_lead_sync(leads, rid) for rid in lead_ids]
+        
+        # 按台账表汇总所有线索的待写记录，每张表按批调用 batch_create，表与表之间并发
+        by_table = defaultdict(list)
+        for i, (entries, _) in enumerate(plans):
+            for j, (_, table_id, sales_data) in enumerate(entries):
+                if table_id:
+                    by_table[table_id].append((i, j, sales_data))
+        
+        pending = []
+        for table_id, items in by_table.items():
+            for start in range(0, len(items), self.BATCH_SIZE):
+                chunk = items[start:start + self.BATCH_SIZE]
+                records = [{"fields": sales_data} for _, _, sales_data in chunk]
+                pending.append((chunk, _submit_io(self.client.batch_create_records, table_id, records)))
+        
+        # (线索序号, 产品序号) -> 是否创建成功 / 异常
+        outcomes = {}
+        for chunk, future in pending:
+            try:
+                new_ids = future.result()
+            except Exception as e:
+                for i, j, _ in chunk:
+                    outcomes[(i, j)] = e
+                continue
+            for (i, j, _), new_id in zip(chunk, new_ids):
+                outcomes[(i, j)] = bool(new_id)
+        
+        results = []
+        synced_ids = []
+        for i, (rid, (entries, error)) in enumerate(zip(lead_ids, plans)):
+            if error:
+                results.append((False, error))
+                continue
+            
+            synced = []
+            errors = []
+            for j, (product, table_id, _) in enumerate(entries):
+                if not table_id:
+                    errors.append(f"产品'{product}'无对应表")
+                    continue
+                outcome = outcomes.get((i, j), False)
+                if isinstance(outcome, Exception):
+                    errors.append(f"{product}: {outcome}")
+                elif outcome:
+                    synced.append(product)
+            
+            if synced:
+                synced_ids.append(rid)
+                results.append((True, f"已同步: {', '.join(synced)}"))
+            else:
+                results.append((False, "; ".join(errors) if errors else "同步失败"))
+        
+        if synced_ids:
+            # 更新线索状态
+            self._batch_update_records(
+                TABLE_LEADS, list(dict.fromkeys(synced_ids)), {"线索状态": "已同步"}, date_fields=["获取日期"]
+            )
+        return results
     
     def batch_sync_leads(self, lead_ids: List[str]) -> Dict:
         """批量同步线索"""
         results = {"success": 0, "failed": 0, "details": []}
-        for rid in lead_ids:
-            ok, msg = self.sync_lead_to_sales(rid)
+        # 线索表只加载、索引一次，台账记录按表批量写入
+        try:
+            leads = self._index_by_record_id(self.get_leads())
+            outcomes = self._sync_leads(leads, lead_ids)
+        except Exception as e:
+            outcomes = [(False, str(e))] * len(lead_ids)
+        
+        for rid, (ok, msg) in zip(lead_ids, outcomes):
             results["success" if ok else "failed"] += 1
             results["details"].append({"record_id": rid, "success": ok, "message": msg})
         return results
@@ -601,34 +782,34 @@ class MarketingService:
         if df.empty or "平台" not in df.columns:
             return pd.DataFrame()
         
-        agg_dict = {}
-        for col in ["投放费用", "views", "likes", "comments", "shares", "new_fans"]:
-            if col in df.columns:
-                agg_dict[col] = "sum"
-        
-        if not agg_dict:
-            return df.groupby("平台").size().reset_index(name="发布数")
+        # 命名聚合：求和与计数在同一次 agg 中完成
+        named_aggs = {
+            col: (col, "sum")
+            for col in ["投放费用", "views", "likes", "comments", "shares", "new_fans"]
+            if col in df.columns
+        }
+        named_aggs["发布数"] = ("record_id", "size")
         
-        stats = df.groupby("平台").agg(agg_dict).reset_index()
-        stats["发布数"] = df.groupby("平台").size().values
-        return stats
+        return df.groupby("平台").agg(**named_aggs).reset_index()
     
     def get_topic_performance(self) -> pd.DataFrame:
         """选题效果排名"""
+        # 两张表的读取互不依赖，并发请求
+        topics_future = _submit_io(self.get_topics)
         posts_df = self.get_posts()
-        topics_df = self.get_topics()
+        topics_df = topics_future.result()
         
         if posts_df.empty or topics_df.empty:
             return pd.DataFrame()
         
         # 按选题汇总
-        agg_dict = {"投放费用": "sum"}
+        named_aggs = {"投放费用": ("投放费用", "sum")}
         for col in ["views", "likes", "new_fans"]:
             if col in posts_df.columns:
-                agg_dict[col] = "sum"
+                named_aggs[col] = (col, "sum")
+        named_aggs["平台数"] = ("平台", "nunique")
         
-        topic_stats = posts_df.groupby("选题ID").agg(agg_dict).reset_index()
-        topic_stats["平台数"] = posts_df.groupby("选题ID")["平台"].nunique().values
+        topic_stats = posts_df.groupby("选题ID").agg(**named_aggs).reset_index()
         
         # 关联选题信息
         if "选题ID" in topics_df.columns:
@@ -10,11 +10,14 @@
 """
 
 import json
+import time
 import pandas as pd
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from dateutil.relativedelta import relativedelta
 
+from data.json_utils import json_loads, json_dumps
+
 
 class PaymentScheduleService:
     """付款节奏服务"""
@@ -60,9 +63,23 @@ class PaymentScheduleService:
             }
             rows.append(row)
         
-        self._cache = pd.DataFrame(rows) if rows else pd.DataFrame()
+        # 以主表 record_id 为索引（保留该列），按 record_id 查找走索引
+        self._cache = (
+            pd.DataFrame(rows).set_index("record_id", drop=False).rename_axis(None)
+            if rows else pd.DataFrame()
+        )
         return self._cache
     
+    @staticmethod
+    def _find_record(df: pd.DataFrame, source_record_id: str) -> Optional[pd.Series]:
+        """按主表 record_id 取第一条匹配记录，没有则返回 None"""
+        if df.empty or "record_id" not in df.columns:
+            return None
+        try:
+            return df.loc[[source_record_id]].iloc[0]
+        except KeyError:
+            return None
+    
     def get_payment_stages(self, source_record_id: str) -> List[Dict]:
         """
         获取指定记录的付款节点
@@ -73,31 +90,23 @@ class PaymentScheduleService:
         Returns:
             付款节点列表
         """
-        df = self.load()
-        if df.empty or "record_id" not in df.columns:
-            return []
-        
-        hit = df[df["record_id"] == source_record_id]
-        if hit.empty:
+        hit = self._find_record(self.load(), source_record_id)
+        if hit is None:
             return []
         
-        stages_json = hit.iloc[0].get("payment_stages", "[]")
+        stages_json = hit.get("payment_stages", "[]")
         try:
-            return json.loads(stages_json) if stages_json else []
+            return json_loads(stages_json) if stages_json else []
         except json.JSONDecodeError:
             return []
     
     def get_template_name(self, source_record_id: str) -> str:
         """获取指定记录使用的模板名称"""
-        df = self.load()
-        if df.empty or "record_id" not in df.columns:
+        hit = self._find_record(self.load(), source_record_id)
+        if hit is None:
             return ""
         
-        hit = df[df["record_id"] == source_record_id]
-        if hit.empty:
-            return ""
-        
-        return hit.iloc[0].get("template_name", "")
+        return hit.get("template_name", "")
     
     def save(
         self,
@@ -117,20 +126,15 @@ class PaymentScheduleService:
             是否保存成功
         """
         # 查找是否已存在记录
-        df = self.load(force_refresh=True)
-        ps_record_id = None
-        
-        if not df.empty and "record_id" in df.columns:
-            hit = df[df["record_id"] == source_record_id]
-            if not hit.empty:
-                ps_record_id = hit.iloc[0].get("_ps_record_id")
+        hit = self._find_record(self.load(force_refresh=True), source_record_id)
+        ps_record_id = hit.get("_ps_record_id") if hit is not None else None
         
         # 构建字段数据
         fields = {
             "record_id": source_record_id,
             "template_name": template_name,
-            "payment_stages": json.dumps(payment_stages, ensure_ascii=False),
-            "updated_at": int(datetime.now().timestamp() * 1000),  # Unix 时间戳（毫秒）
+            "payment_stages": json_dumps(payment_stages),
+            "updated_at": time.time_ns() // 1_000_000,  # Unix 时间戳（毫秒）
         }
         
         try:
@@ -219,14 +223,10 @@ class PaymentScheduleService:
         Returns:
             包含金额的付款节点列表
         """
-        result = []
-        for stage in payment_stages:
-            amount = total_amount * stage.get("ratio", 0)
-            result.append({
-                **stage,
-                "amount": round(amount, 2),
-            })
-        return result
+        return [
+            {**stage, "amount": round(total_amount * stage.get("ratio", 0), 2)}
+            for stage in payment_stages
+        ]
     
     @staticmethod
     def stages_to_dataframe(
@@ -262,6 +262,7 @@ class PaymentScheduleService:
         # 转换日期格式
         if "付款日期" in df.columns:
             df["付款日期"] = pd.to_datetime(df["付款日期"], unit="ms", errors="coerce")
-            df["付款月份"] = df["付款日期"].dt.strftime("%Y-%m")
+            # 按月 Period 转字符串，比逐个 strftime 快；NaT 保持为空
+            df["付款月份"] = df["付款日期"].dt.to_period("M").astype(str).where(df["付款日期"].notna())
         
         return df
\ No newline at end of file
@@ -1,7 +1,91 @@
 # data/schema.py - 数据架构标准
+import numpy as np
 import pandas as pd
-from typing import Dict, Any, List, Optional, Union
+from pandas.api.types import is_datetime64_any_dtype, is_numeric_dtype
+from typing import ClassVar, Dict, Any, FrozenSet, List, Optional, Tuple, Union
 from datetime import datetime, date
+from functools import lru_cache
+from itertools import product
+
+
+# 转成文本后视为空值的写法：'nan' / 'none' / '' 的所有大小写组合
+_NAN_STRINGS = frozenset(
+    "".join(chars)
+    for word in ("nan", "none", "")
+    for chars in product(*[(c.lower(), c.upper()) for c in word])
+)
+
+
+# astype(str) 得到的列类型（pandas 3 为 str，更早版本为 object）
+_STR_DTYPE = pd.Series([], dtype=str).dtype
+
+# "string[pyarrow]" 列的目标类型：Arrow 紧凑存储的字符串，没有 pyarrow 时退回 pandas 自带的字符串类型
+try:
+    import pyarrow  # noqa: F401
+    _TEXT_DTYPE = pd.StringDtype("pyarrow")
+except ImportError:
+    _TEXT_DTYPE = pd.StringDtype("python")
+
+
+def _replace_where(series: pd.Series, mask: pd.Series, value: Any) -> pd.Series:
+    """返回 mask 处替换为 value 的列；不改动传入的列，没有命中时原样返回"""
+    if not mask.any():
+        return series
+    series = series.copy()
+    series[mask] = value
+    return series
+
+
+@lru_cache(maxsize=1)
+def _sample_data_frame() -> pd.DataFrame:
+    """示例数据（只构造一次，取用时复制）"""
+    sample_data = [
+        {
+            "客户": "示例客户1",
+            "业务线": "光谱设备/服务",
+            "金额": 100.0,
+            "成单率": 80.0,
+            "人工纠偏金额": 80.0,
+            "预计截止时间": datetime(2024, 6, 30),
+            "当前进展": "谈判中",
+            "首付款比例": 50.0,
+            "次付款比例": 40.0,
+            "尾款比例": 0.0,
+            "质款金比例": 10.0,
+            "主要描述": "合同设备采购"
+        },
+        {
+            "客户": "示例客户2",
+            "业务线": "配液设备",
+            "金额": 200.0,
+            "成单率": 60.0,
+            "人工纠偏金额": 120.0,
+            "预计截止时间": datetime(2024, 9, 15),
+            "当前进展": "需求确认",
+            "首付款比例": 30.0,
+            "次付款比例": 50.0,
+            "尾款比例": 10.0,
+            "质保金比例": 10.0,
+            "主要描述": "自动化改造"
+        }
+    ]
+
+    return pd.DataFrame(sample_data)
+
+
+@lru_cache(maxsize=None)
+def _field_descriptions(schema_cls) -> Dict[str, str]:
+    """各列描述（按架构类缓存）"""
+    return {col_name: col_def["description"]
+            for col_name, col_def in schema_cls.get_all_columns().items()
+            if "description" in col_def}
+
+
+@lru_cache(maxsize=None)
+def _payment_stages(schema_cls) -> Tuple[str, ...]:
+    """付款阶段名称（按架构类缓存）"""
+    return tuple(col.replace("比例", "") for col in schema_cls.PAYMENT_COLUMNS.keys()
+                 if col.endswith("比例"))
 
 
 class DataSchema:
@@ -13,7 +97,7 @@ class DataSchema:
     # 必需列定义
     REQUIRED_COLUMNS = {
         "客户": {
-            "data_type": "string",
+            "data_type": "string[pyarrow]",
             "nullable": False,
             "description": "客户名称",
             "max_length": 255
@@ -64,18 +148,18 @@ class DataSchema:
             "description": "预期交付月份"
         },
         "当前进展": {
-            "data_type": "string",
+            "data_type": "string[pyarrow]",
             "nullable": True,
             "description": "项目当前进展状态"
         },
         "主要描述": {
-            "data_type": "string",
+            "data_type": "string[pyarrow]",
             "nullable": True,
             "max_length": 1000,
             "description": "项目主要描述"
         },
         "交付内容": {
-            "data_type": "string",
+            "data_type": "string[pyarrow]",
             "nullable": True,
             "description": "交付内容说明"
         },
@@ -146,7 +230,7 @@ class DataSchema:
     # 技术列定义（用于内部处理）
     TECHNICAL_COLUMNS = {
         "record_id": {
-            "data_type": "string",
+            "data_type": "string[pyarrow]",
             "nullable": True,
             "description": "飞书记录ID"
         },
@@ -157,21 +241,70 @@ class DataSchema:
         }
     }
 
+    # 列定义的派生结果，首次使用时计算一次（列定义是类常量，不会变化）
+    _ALL_COLUMNS_CACHE: ClassVar[Optional[Dict[str, Dict[str, Any]]]] = None
+    _COLUMN_DTYPES: ClassVar[Dict[str, str]] = {}
+    _NUMERIC_COLS: ClassVar[FrozenSet[str]] = frozenset()
+    _INT_COLS: ClassVar[FrozenSet[str]] = frozenset()
+    _DATETIME_COLS: ClassVar[FrozenSet[str]] = frozenset()
+    _STRING_COLS: ClassVar[FrozenSet[str]] = frozenset()
+    _TEXT_COLS: ClassVar[FrozenSet[str]] = frozenset()
+    _CATEGORY_COLS: ClassVar[FrozenSet[str]] = frozenset()
+    # 数值列（按定义顺序）及与之逐位对齐的上下限数组，没有限制的为 NaN
+    _NUMERIC_COL_ORDER: ClassVar[Tuple[str, ...]] = ()
+    _MIN_BOUNDS: ClassVar[np.ndarray] = np.empty(0)
+    _MAX_BOUNDS: ClassVar[np.ndarray] = np.empty(0)
+    # 其余（非数值）列，按定义顺序
+    _OTHER_COL_ORDER: ClassVar[Tuple[str, ...]] = ()
+    # 需要检查取值范围的列 -> (下限, 上限)，供 validate_dataframe 查表
+    _RANGE_CHECK: ClassVar[Dict[str, Tuple[Any, Any]]] = {}
+
     # 所有列的合并字典
     @classmethod
-    def get_all_columns(cls):
-        """获取所有列定义"""
-        columns = {}
-        columns.update(cls.REQUIRED_COLUMNS)
-        columns.update(cls.BUSINESS_COLUMNS)
-        columns.update(cls.PAYMENT_COLUMNS)
-        columns.update(cls.TECHNICAL_COLUMNS)
-        return columns
+    def get_all_columns(cls) -> Dict[str, Dict[str, Any]]:
+        """获取所有列定义（缓存的同一个字典，调用方只读）"""
+        # 只认本类自己的缓存，避免子类拿到父类的结果
+        if cls.__dict__.get("_ALL_COLUMNS_CACHE") is None:
+            columns = {}
+            columns.update(cls.REQUIRED_COLUMNS)
+            columns.update(cls.BUSINESS_COLUMNS)
+            columns.update(cls.PAYMENT_COLUMNS)
+            columns.update(cls.TECHNICAL_COLUMNS)
+
+            dtypes = {name: col_def["data_type"] for name, col_def in columns.items()}
+
+            def _cols_of(*types: str) -> FrozenSet[str]:
+                return frozenset(name for name, t in dtypes.items() if t in types)
+
+            cls._COLUMN_DTYPES = dtypes
+            cls._NUMERIC_COLS = _cols_of("numeric", "float64")
+            cls._INT_COLS = _cols_of("int64")
+            cls._DATETIME_COLS = _cols_of("datetime64[ns]")
+            cls._STRING_COLS = _cols_of("string")
+            cls._TEXT_COLS = _cols_of("string[pyarrow]")
+            cls._CATEGORY_COLS = _cols_of("category")
+
+            numeric_order = tuple(name for name in columns if name in cls._NUMERIC_COLS)
+            cls._NUMERIC_COL_ORDER = numeric_order
+            cls._MIN_BOUNDS = np.array(
+                [columns[name].get("min_value", np.nan) for name in numeric_order], dtype=np.float64
+            )
+            cls._MAX_BOUNDS = np.array(
+                [columns[name].get("max_value", np.nan) for name in numeric_order], dtype=np.float64
+            )
+            cls._OTHER_COL_ORDER = tuple(name for name in columns if name not in cls._NUMERIC_COLS)
+            cls._RANGE_CHECK = {
+                name: (columns[name].get("min_value", float('-inf')), columns[name].get("max_value", float('inf')))
+                for name in columns if dtypes[name] in ("numeric", "float64", "int64")
+            }
+            cls._ALL_COLUMNS_CACHE = columns
+        return cls._ALL_COLUMNS_CACHE
 
     @classmethod
     def ensure_required_columns(cls, df: pd.DataFrame) -> pd.DataFrame:
         """确保DataFrame包含所有必需列"""
-        result_df = df.copy()
+        # 浅拷贝：只新增列，不改动已有列的数据
+        result_df = df.copy(deep=False)
 
         for col_name, col_def in cls.REQUIRED_COLUMNS.items():
             if col_name not in result_df.columns:
@@ -181,64 +314,80 @@ class DataSchema:
                 # 设置默认值
                 result_df[col_name] = default_value
 
-                # 特殊处理人工纠偏金额
-                if col_name == "人工纠偏金额" and (result_df.empty or
-                                              result_df[col_name].isna().all() or
-                                              (result_df[col_name] == 0).all()):
-                    result_df[col_name] = result_df["金额"]
-
+        # 人工纠偏金额不属于必需列，由 DataManager 按 overrides 表合并生成，这里不补
         return result_df
 
     @classmethod
     def cast_column_types(cls, df: pd.DataFrame) -> pd.DataFrame:
         """转换列类型为标准格式"""
-        result_df = df.copy()
+        # 浅拷贝：每列都是整列替换（需要改值的列先复制该列），不会写回传入的 df
+        result_df = df.copy(deep=False)
         all_columns = cls.get_all_columns()
 
-        for col_name, col_def in all_columns.items():
-            if col_name in result_df.columns:
-                try:
-                    data_type = col_def["data_type"]
-
-                    # 根据数据类型进行转换
-                    if data_type in ["numeric", "float64"]:
+        # 数值列逐列转成数值后，按各列上下限一次性裁剪；已是数值类型、且都在范围内的列原样保留
+        positions = [i for i, c in enumerate(cls._NUMERIC_COL_ORDER) if c in result_df.columns]
+        numeric_cols = [cls._NUMERIC_COL_ORDER[i] for i in positions]
+        if numeric_cols:
+            try:
+                for col_name in numeric_cols:
+                    if not is_numeric_dtype(result_df[col_name]):
                         result_df[col_name] = pd.to_numeric(result_df[col_name], errors='coerce')
-                        if "min_value" in col_def:
-                            min_val = col_def["min_value"]
-                            result_df.loc[result_df[col_name] < min_val, col_name] = min_val
-                        if "max_value" in col_def:
-                            max_val = col_def["max_value"]
-                            result_df.loc[result_df[col_name] > max_val, col_name] = max_val
-
-                    elif data_type == "int64":
+                lower, upper = cls._MIN_BOUNDS[positions], cls._MAX_BOUNDS[positions]
+                values = result_df[numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+                if np.any((values < lower) | (values > upper)):
+                    result_df[numeric_cols] = result_df[numeric_cols].clip(lower=lower, upper=upper, axis=1)
+            except Exception as e:
+                print(f"警告: 转换列 {', '.join(numeric_cols)} 失败: {str(e)}")
+
+        # 数值列已在上面处理，这里只遍历 df 中存在的其余列（按定义顺序）
+        present = result_df.columns
+        for col_name in [c for c in cls._OTHER_COL_ORDER if c in present]:
+            col_def = all_columns[col_name]
+            try:
+                # 根据数据类型进行转换
+                # 已是目标类型的列跳过转换，不重新分配数据
+                dtype = result_df[col_name].dtype
+
+                if col_name in cls._INT_COLS:
+                    if dtype != "Int64":
                         result_df[col_name] = pd.to_numeric(result_df[col_name], errors='coerce').astype("Int64")
 
-                    elif data_type == "string":
-                        if result_df[col_name].dtype.name in ['object', 'category']:
-                            result_df[col_name] = result_df[col_name].astype(str)
-                            # 处理特定值
-                            result_df.loc[result_df[col_name].str.lower().isin(['nan', 'none', '']), col_name] = ""
-                        else:
-                            result_df[col_name] = result_df[col_name].astype(str)
-
-                    elif data_type == "datetime64[ns]":
+                elif col_name in cls._STRING_COLS:
+                    if dtype.name in ['object', 'category']:
+                        result_df[col_name] = result_df[col_name].astype(str)
+                        # 处理特定值
+                        result_df.loc[result_df[col_name].isin(_NAN_STRINGS), col_name] = ""
+                    elif dtype != _STR_DTYPE:
+                        result_df[col_name] = result_df[col_name].astype(str)
+
+                elif col_name in cls._TEXT_COLS:
+                    if dtype != _TEXT_DTYPE:
+                        # 缺失值以及 'nan'/'none' 等写法统一为空串
+                        values = result_df[col_name].astype(_TEXT_DTYPE).fillna("")
+                        result_df[col_name] = _replace_where(values, values.isin(_NAN_STRINGS), "")
+
+                elif col_name in cls._DATETIME_COLS:
+                    if not is_datetime64_any_dtype(dtype):
                         # 首先尝试标准日期格式
                         result_df[col_name] = pd.to_datetime(result_df[col_name], errors='coerce')
 
-                    elif data_type == "category":
-                        if "categories" in col_def:
-                            categories = col_def["categories"]
-                            # 确保值在有效分类中
-                            invalid_mask = ~result_df[col_name].isin(categories) & result_df[col_name].notna()
-                            result_df.loc[invalid_mask, col_name] = ""  # 或第一个有效分类
+                elif col_name in cls._CATEGORY_COLS:
+                    if "categories" in col_def:
+                        categories = col_def["categories"]
+                        if (isinstance(dtype, pd.CategoricalDtype) and not dtype.ordered
+                                and list(dtype.categories) == list(categories)):
+                            continue
+                        # 确保值在有效分类中
+                        values = result_df[col_name]
+                        invalid_mask = ~values.isin(categories) & values.notna()
+                        values = _replace_where(values, invalid_mask, "")  # 或第一个有效分类
 
-                            result_df[col_name] = result_df[col_name].astype("category")
-                            result_df[col_name] = result_df[col_name].cat.set_categories(categories, ordered=False)
+                        result_df[col_name] = values.astype("category").cat.set_categories(categories, ordered=False)
 
-                except Exception as e:
-                    # 如果转换失败，记录警告
-                    print(f"警告: 转换列 {col_name} 失败: {str(e)}")
-                    continue
+            except Exception as e:
+                # 如果转换失败，记录警告
+                print(f"警告: 转换列 {col_name} 失败: {str(e)}")
+                continue
 
         return result_df
 
@@ -257,48 +406,47 @@ class DataSchema:
             return {"errors": errors, "warnings": warnings}
 
         # 检查必需列
-        missing_columns = []
-        for col_name in cls.REQUIRED_COLUMNS.keys():
-            if col_name not in df.columns:
-                missing_columns.append(col_name)
+        present = df.columns
+        missing_columns = [col_name for col_name in cls.REQUIRED_COLUMNS if col_name not in present]
 
         if missing_columns:
             errors.append(f"缺失必需列: {', '.join(missing_columns)}")
 
         # 检查列类型
         all_columns = cls.get_all_columns()
+        range_check = cls._RANGE_CHECK
         for col_name in df.columns:
-            if col_name in all_columns:
-                col_def = all_columns[col_name]
-
-                # 数据类型检查
-                expected_type = col_def["data_type"]
-                actual_type = str(df[col_name].dtype)
-
-                # 检查数值范围
-                if col_def.get("data_type") in ("numeric", "float64", "int64"):
-                    min_val = col_def.get("min_value", float('-inf'))
-                    max_val = col_def.get("max_value", float('inf'))
-
-                    if df[col_name].dtype.kind in 'if':  # 检查是否为数值类型
-                        invalid_values = df[(df[col_name] < min_val)
-                                          | (df[col_name] > max_val)][col_name]
-
-                        if not invalid_values.empty:
-                            warnings.append(f"列 {col_name} 包含超出范围的值: {min_val} ~ {max_val}")
-
-            else:
+            if col_name not in all_columns:
                 # 存在未定义的列
                 warnings.append(f"存在未定义的列: {col_name}")
+                continue
+
+            # 检查数值范围（只有数值类列在查找表里）
+            bounds = range_check.get(col_name)
+            if bounds is None:
+                continue
+            column = df[col_name]
+            if column.dtype.kind in 'if':  # 检查是否为数值类型
+                min_val, max_val = bounds
+                values = column.to_numpy(dtype=np.float64, na_value=np.nan)
+                if np.count_nonzero((values < min_val) | (values > max_val)):
+                    warnings.append(f"列 {col_name} 包含超出范围的值: {min_val} ~ {max_val}")
 
         # 特殊逻辑验证
-        if all(col in df.columns for col in ['首付款比例', '次付款比例', '尾款比例', '质保金比例']):
-            # 检查付款比例总和
-            total_ratio = df['首付款比例'] + df['次付款比例'] + df['尾款比例'] + df['质保金比例']
-            invalid_ratios = df[abs(total_ratio - 100) > 0.1].index
+        ratio_cols = ['首付款比例', '次付款比例', '尾款比例', '质保金比例']
+        if all(col in present for col in ratio_cols):
+            # 检查付款比例总和（含空值的行总和为 NaN，不计入）
+            ratios = df[ratio_cols]
+            if all(is_numeric_dtype(dtype) for dtype in ratios.dtypes):
+                total_ratio = ratios.to_numpy(dtype=np.float64, na_value=np.nan).sum(axis=1)
+                with np.errstate(invalid='ignore'):
+                    invalid_count = int(np.count_nonzero(np.abs(total_ratio - 100.0) > 0.1))
+            else:
+                total_ratio = df['首付款比例'] + df['次付款比例'] + df['尾款比例'] + df['质保金比例']
+                invalid_count = len(df[abs(total_ratio - 100) > 0.1].index)
 
-            if len(invalid_ratios) > 0:
-                errors.append(f"{len(invalid_ratios)} 行记录付款比例总和不等于100%")
+            if invalid_count > 0:
+                errors.append(f"{invalid_count} 行记录付款比例总和不等于100%")
 
         return {"errors": errors, "warnings": warnings}
 
@@ -337,7 +485,7 @@ class DataSchema:
                         df[col_name] = pd.to_numeric([], errors='coerce')
                     elif col_def["data_type"] == "datetime64[ns]":
                         df[col_name] = pd.to_datetime([])
-                    elif col_def["data_type"] == "string":
+                    elif col_def["data_type"] in ("string", "string[pyarrow]"):
                         df[col_name] = ""
                     elif col_def["data_type"] == "category":
                         categories = col_def.get("categories", [])
@@ -348,60 +496,23 @@ class DataSchema:
     @classmethod
     def get_field_descriptions(cls) -> Dict[str, str]:
         """获取所有字段的描述"""
-        all_columns = cls.get_all_columns()
-        descriptions = {}
-        for col_name, col_def in all_columns.items():
-            if "description" in col_def:
-                descriptions[col_name] = col_def["description"]
-        return descriptions
+        return dict(_field_descriptions(cls))
 
     @classmethod
     def get_sample_data(cls) -> pd.DataFrame:
         """获取示例数据"""
-        sample_data = [
-            {
-                "客户": "示例客户1",
-                "业务线": "光谱设备/服务",
-                "金额": 100.0,
-                "成单率": 80.0,
-                "人工纠偏金额": 80.0,
-                "预计截止时间": datetime(2024, 6, 30),
-                "当前进展": "谈判中",
-                "首付款比例": 50.0,
-                "次付款比例": 40.0,
-                "尾款比例": 0.0,
-                "质款金比例": 10.0,
-                "主要描述": "合同设备采购"
-            },
-            {
-                "客户": "示例客户2",
-                "业务线": "配液设备",
-                "金额": 200.0,
-                "成单率": 60.0,
-                "人工纠偏金额": 120.0,
-                "预计截止时间": datetime(2024, 9, 15),
-                "当前进展": "需求确认",
-                "首付款比例": 30.0,
-                "次付款比例": 50.0,
-                "尾款比例": 10.0,
-                "质保金比例": 10.0,
-                "主要描述": "自动化改造"
-            }
-        ]
-
-        return pd.DataFrame(sample_data)
+        return _sample_data_frame().copy()
 
     @classmethod
     def get_column_data_types(cls) -> Dict[str, str]:
         """获取列数据类型映射"""
-        all_columns = cls.get_all_columns()
-        return {col_name: col_def["data_type"]
-                for col_name, col_def in all_columns.items()}
+        cls.get_all_columns()
+        return dict(cls._COLUMN_DTYPES)
 
     @classmethod
-    def get_business_categories(cls) -> List[str]:
-        """获取业务线分类列表"""
-        return cls.REQUIRED_COLUMNS["业务线"]["categories"]
+    def get_business_categories(cls) -> Tuple[str, ...]:
+        """获取业务线分类（只读元组，避免调用方改动架构常量）"""
+        return tuple(cls.REQUIRED_COLUMNS["业务线"]["categories"])
 
     @classmethod
     def validate_business_category(cls, category: str) -> bool:
@@ -412,9 +523,7 @@ class DataSchema:
     @classmethod
     def get_payment_stages(cls) -> List[str]:
         """获取付款阶段列表"""
-        payment_cols = [col for col in cls.PAYMENT_COLUMNS.keys()
-                       if col.endswith("比例")]
-        return [col.replace("比例", "") for col in payment_cols]
+        return list(_payment_stages(cls))
 
     @classmethod
     def get_payment_columns(cls) -> Dict[str, Dict[str, Any]]:
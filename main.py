@@ -6,14 +6,32 @@
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+import numpy as np
 import plotly.graph_objects as go
+import plotly.io as pio
 from datetime import datetime, timezone, timedelta
-import re
 
 # 北京时区 (UTC+8)
 BEIJING_TZ = timezone(timedelta(hours=8))
 
+# 首页图表共用的透明背景与边距，注册一次；叠加在 Streamlit 默认主题上使用（"streamlit+salt"），不改全局默认
+if "salt" not in pio.templates:
+    pio.templates["salt"] = go.layout.Template(layout=dict(
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        margin=dict(t=20, b=20, l=20, r=20),
+    ))
+_CHART_TEMPLATE = "streamlit+salt" if "streamlit" in pio.templates else "salt"
+
+
+def _render_html(html: str) -> None:
+    """输出静态 HTML/CSS：st.html（Streamlit 1.33+）不经过 Markdown 解析，老版本退回 st.markdown"""
+    if hasattr(st, "html"):
+        st.html(html)
+    else:
+        st.markdown(html, unsafe_allow_html=True)
+
+
 # ============================================================
 # 0. 基础配置与检查 (保持逻辑不变)
 # ============================================================
@@ -28,6 +46,7 @@ st.set_page_config(
 try:
     from config import is_configured, get_config_status
     from utils.auth import check_password, show_user_info
+    from utils.page_init import refresh_allowed, mark_refreshed
     from data.data_manager import data_manager
 except ImportError:
     st.error("❌ 模块导入失败，请确保 config.py, utils/, data/ 目录存在且完整。")
@@ -50,7 +69,7 @@ data_manager.set_state_store(st.session_state)
 # ============================================================
 # 1. 高端 UI 样式定义 (CSS)
 # ============================================================
-st.markdown("""
+_CSS = """
 <style>
     /* ================================
        Global tokens
@@ -160,6 +179,18 @@ st.markdown("""
         font-weight: 700;
     }
 
+    /* KPI 卡片栅格：四张卡片一行，窄屏时竖排 */
+    .kpi-grid {
+        display: grid;
+        grid-template-columns: repeat(4, 1fr);
+        gap: 1rem;
+    }
+    @media (max-width: 640px) {
+        .kpi-grid {
+            grid-template-columns: 1fr;
+        }
+    }
+
     /* Section header（更紧凑，更像模块标题） */
     .section-header {
         font-size: 1.05rem;
@@ -282,28 +313,39 @@ st.markdown("""
         }
     }
 </style>
-""", unsafe_allow_html=True)
+"""
 
-# ============================================================
-# 2. 侧边栏
-# ============================================================
-with st.sidebar:
-    # === 品牌区域 ===
-    st.markdown("""
+_SIDEBAR_BRAND_HTML = """
     <div class="sidebar-brand-card">
         <div class="sidebar-brand-icon">📊</div>
         <div class="sidebar-brand-title">销售预测系统</div>
         <div class="sidebar-brand-subtitle">Digital Salt · 数据驱动决策</div>
     </div>
-    """, unsafe_allow_html=True)
+    """
+
+_SIDEBAR_SECTION_HTML = '<div class="sidebar-section-label">📁 功能模块</div>'
+
+_FOOTER_HTML = """
+    <div style='text-align: center; color: #94a3b8; font-size: 0.8rem;'>
+        Sales Forecast System &copy; 2025 · Powered by Feishu & Streamlit
+    </div>
+    """
+
+# 每次运行都要注入：Streamlit 重跑时会移除本轮没有再输出的元素，只注入一次样式会在交互后丢失
+_render_html(_CSS)
+
+# ============================================================
+# 2. 侧边栏
+# ============================================================
+with st.sidebar:
+    # === 品牌区域 ===
+    _render_html(_SIDEBAR_BRAND_HTML)
     
     # === 首页入口（突出显示）===
     st.page_link("main.py", label="🏠 首页总览", icon=None)
     
     # === 功能模块标签 ===
-    st.markdown("""
-    <div class="sidebar-section-label">📁 功能模块</div>
-    """, unsafe_allow_html=True)
+    _render_html(_SIDEBAR_SECTION_HTML)
     
     st.markdown("---")
     
@@ -316,36 +358,39 @@ with st.sidebar:
     st.caption(f"🕐 上次更新: {datetime.now(BEIJING_TZ).strftime('%H:%M')}")
     
     if st.button("🔄 刷新全量数据", use_container_width=True):
-        with st.spinner("正在同步飞书数据..."):
-            data_manager.refresh_data()
-        st.success("数据已更新")
-        st.rerun()
+        # 刷新刚结束又点（连点、刷新期间排队的点击）时不再重复拉取飞书全量数据
+        if refresh_allowed():
+            with st.spinner("正在同步飞书数据..."):
+                data_manager.refresh_data()
+            mark_refreshed()
+            st.success("数据已更新")
+            st.rerun()
+        else:
+            st.info("数据刚刚已刷新，请稍后再试")
 
 # ============================================================
 # 3. 数据处理逻辑
 # ============================================================
-df = pd.DataFrame()
-try:
+# _final_amount / _rate 由 data_manager 在加载数据时算好，这里直接使用
+@st.cache_data(ttl=300, show_spinner=False)
+def load_dashboard_data(data_version) -> pd.DataFrame:
+    """读取当前数据；数据版本不变时（控件交互触发的重跑）直接复用结果"""
     df = data_manager.get_active_data()
     
-    # 统一字段名处理，防止报错
-    if "_final_amount" not in df.columns and "金额" in df.columns:
-        df["_final_amount"] = df["金额"]
-    if "_final_amount" not in df.columns:
-        df["_final_amount"] = 0
-        
-    # 处理成单率解析
-    def parse_rate(r):
-        if isinstance(r, (int, float)): return r
-        if isinstance(r, str):
-            nums = re.findall(r'\d+', r)
-            return sum(int(n) for n in nums) / len(nums) if nums else 0
-        return 0
-    
-    if "成单率" in df.columns:
-        df["_rate"] = df["成单率"].apply(parse_rate)
-    else:
-        df["_rate"] = 0
+    # 需要补的列和类型转换收集到一起，用一次 assign 生成结果，不逐列原地改写
+    # 没有任何数据时返回的是空表，补上派生列，防止报错
+    extra = {col: 0 for col in ("_final_amount", "_rate") if col not in df.columns}
+    # 业务线只有少数几个取值，转为分类类型后按整数编码分组
+    if "业务线" in df.columns and not isinstance(df["业务线"].dtype, pd.CategoricalDtype):
+        extra["业务线"] = df["业务线"].astype("category")
+    return df.assign(**extra) if extra else df
+
+df = pd.DataFrame()
+try:
+    # 首次进入时先加载，使会话里有数据版本，再按版本取缓存结果
+    if data_manager.last_refresh_timestamp() is None:
+        data_manager.get_active_data()
+    df = load_dashboard_data(data_manager.last_refresh_timestamp())
 
 except Exception as e:
     st.error(f"数据加载异常: {e}")
@@ -362,16 +407,82 @@ with col_hero:
     hour = now_beijing.hour
     greeting = "早安" if hour < 12 else "午安" if hour < 18 else "晚上好"
     
-    st.markdown(f'<div class="hero-title">{greeting}，咸蛋们</div>', unsafe_allow_html=True)
-    st.markdown(f'<div class="hero-subtitle">今天是 {now_beijing.strftime("%Y年%m月%d日")} · 让我们查看今日的业绩预测</div>', unsafe_allow_html=True)
+    _render_html(
+        f'<div class="hero-title">{greeting}，咸蛋们</div>'
+        f'<div class="hero-subtitle">今天是 {now_beijing.strftime("%Y年%m月%d日")} · 让我们查看今日的业绩预测</div>'
+    )
 
 # ============================================================
 # 5. 自定义 KPI 卡片区域
 # ============================================================
+# 成单率只转换一次数组，KPI 与底部概率分布共用；只计数不筛选出子表
+rate_arr = df["_rate"].to_numpy(dtype=np.float64, na_value=np.nan)
+rate_valid = rate_arr[~np.isnan(rate_arr)]
 total_projects = len(df)
-total_revenue = df["_final_amount"].sum()
-high_prob_count = len(df[df["_rate"] >= 50])
-avg_rate = df["_rate"].mean() if not df.empty else 0
+total_revenue = np.nansum(df["_final_amount"].to_numpy(dtype=np.float64, na_value=np.nan))
+high_prob_count = int(np.count_nonzero(rate_valid >= 50))
+avg_rate = (rate_valid.mean() if rate_valid.size else np.nan) if rate_arr.size else 0
+
+# 图表只依赖少量汇总数字，按数字缓存构造好的图，数据不变时重跑不再重建
+@st.cache_data(show_spinner=False)
+def build_biz_pie(labels: tuple, values: tuple) -> go.Figure:
+    """业务营收占比甜甜圈图"""
+    # 更加高级的配色
+    colors = ['#6366f1', '#8b5cf6', '#ec4899', '#f43f5e', '#10b981', '#3b82f6']
+    
+    # 只有几个分组，直接用数组构造饼图，不走 plotly express 的 DataFrame 解析
+    fig = go.Figure(go.Pie(
+        values=list(values),
+        labels=list(labels),
+        hole=0.6, # 甜甜圈图看起来更现代
+        hovertemplate="业务线=%{label}<br>_final_amount=%{value}<extra></extra>",
+        textposition='outside',
+        textinfo='percent+label',
+    ))
+    fig.update_layout(
+        template=_CHART_TEMPLATE,
+        piecolorway=colors,
+        showlegend=True,
+        legend=dict(orientation="h", yanchor="bottom", y=-0.1, xanchor="center", x=0.5),
+        height=350,
+        font=dict(family="Inter", size=13)
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def build_rate_bar(counts: tuple) -> go.Figure:
+    """项目概率分布横向条形图"""
+    labels = ['低概率 (<30%)', '中概率 (30-50%)', '高概率 (50-80%)', '准成交 (≥80%)']
+    # 颜色映射
+    color_map = {
+        '低概率 (<30%)': '#94a3b8',
+        '中概率 (30-50%)': '#60a5fa',
+        '高概率 (50-80%)': '#818cf8',
+        '准成交 (≥80%)': '#34d399'
+    }
+
+    fig_bar = go.Figure(go.Bar(
+        x=list(counts),
+        y=labels,
+        orientation='h',
+        text=list(counts),
+        marker_color=[color_map[label] for label in labels],
+        hovertemplate='类型=%{y}<br>数量=%{x}<extra></extra>',
+        textposition='auto',
+        textfont_size=14,
+    ))
+    fig_bar.update_layout(
+        template=_CHART_TEMPLATE,
+        yaxis=dict(categoryorder='array', categoryarray=labels[::-1]), # 从上到下按概率由低到高
+        height=250,
+        xaxis_title="",
+        yaxis_title="",
+        showlegend=False,
+        margin=dict(l=0, r=0, t=0, b=0),
+        xaxis=dict(showgrid=False, showticklabels=False), # 隐藏X轴，追求极简
+    )
+    return fig_bar
 
 # 定义卡片 HTML 生成函数
 def kpi_card_html(label, value, sub_text, sub_class="trend-neutral"):
@@ -383,16 +494,16 @@ def kpi_card_html(label, value, sub_text, sub_class="trend-neutral"):
     </div>
     """
 
-c1, c2, c3, c4 = st.columns(4)
-
-with c1:
-    st.markdown(kpi_card_html("在跟项目总数", f"{total_projects}", "活跃项目", "trend-neutral"), unsafe_allow_html=True)
-with c2:
-    st.markdown(kpi_card_html("预测总营收 (万)", f"¥{total_revenue:,.1f}", "基于加权计算", "trend-up"), unsafe_allow_html=True)
-with c3:
-    st.markdown(kpi_card_html("高优项目 (>50%)", f"{high_prob_count}", "重点跟进", "trend-up"), unsafe_allow_html=True)
-with c4:
-    st.markdown(kpi_card_html("平均成单率", f"{avg_rate:.1f}%", "整体健康度", "trend-neutral"), unsafe_allow_html=True)
+kpi_rows = [
+    ("在跟项目总数", f"{total_projects}", "活跃项目", "trend-neutral"),
+    ("预测总营收 (万)", f"¥{total_revenue:,.1f}", "基于加权计算", "trend-up"),
+    ("高优项目 (>50%)", f"{high_prob_count}", "重点跟进", "trend-up"),
+    ("平均成单率", f"{avg_rate:.1f}%", "整体健康度", "trend-neutral"),
+]
+# 四张卡片拼成一段 HTML 一次输出，由 .kpi-grid 排成一行
+# （去掉首尾空白：卡片之间不能出现空行，否则缩进的下一张卡片会被 Markdown 当成代码块）
+cards_html = "".join(kpi_card_html(*row).strip() for row in kpi_rows)
+st.markdown(f'<div class="kpi-grid">{cards_html}</div>', unsafe_allow_html=True)
 
 st.markdown("###") # 增加间距
 
@@ -407,25 +518,8 @@ with col_left:
     st.markdown('<div class="section-header">📊 业务营收占比</div>', unsafe_allow_html=True)
     with st.container(): # 这里其实可以用自定义CSS包裹，但Streamlit原生容器+Plotly透明背景已足够好
         if "业务线" in df.columns:
-            biz_data = df.groupby("业务线")["_final_amount"].sum().reset_index()
-            
-            # 更加高级的配色
-            colors = ['#6366f1', '#8b5cf6', '#ec4899', '#f43f5e', '#10b981', '#3b82f6']
-            
-            fig = px.pie(biz_data, values="_final_amount", names="业务线",
-                         color_discrete_sequence=colors,
-                         hole=0.6) # 甜甜圈图看起来更现代
-            
-            fig.update_layout(
-                showlegend=True,
-                legend=dict(orientation="h", yanchor="bottom", y=-0.1, xanchor="center", x=0.5),
-                margin=dict(t=20, b=20, l=20, r=20),
-                height=350,
-                paper_bgcolor='rgba(0,0,0,0)', # 透明背景融入
-                plot_bgcolor='rgba(0,0,0,0)',
-                font=dict(family="Inter", size=13)
-            )
-            fig.update_traces(textposition='outside', textinfo='percent+label')
+            biz_data = df.groupby("业务线", observed=True)["_final_amount"].sum()
+            fig = build_biz_pie(tuple(biz_data.index.astype(str)), tuple(biz_data.to_numpy().tolist()))
             st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
         else:
             st.info("暂无业务线数据")
@@ -440,17 +534,13 @@ with col_right:
         if "客户" in df.columns: table_cols.append("客户")
         if "业务线" in df.columns: table_cols.append("业务线")
         
-        # 构造用于显示的数据
-        display_df = df.copy()
+        # 先按预测金额取前8行的位置，只取这8行构造显示数据，不复制整表
+        top_pos = df["_final_amount"].reset_index(drop=True).nlargest(8).index.to_numpy()
+        display_df = df[table_cols].iloc[top_pos].copy()
         
         # 【修复点 1】：直接使用 _rate (0-100的数值)，不要除以 100
-        display_df["成单概率"] = display_df["_rate"] 
-        display_df["预测金额"] = display_df["_final_amount"]
-        
-        final_cols = table_cols + ["成单概率", "预测金额"]
-        
-        # 排序取前8
-        display_df = display_df.nlargest(8, "预测金额")[final_cols]
+        display_df["成单概率"] = df["_rate"].to_numpy()[top_pos]
+        display_df["预测金额"] = df["_final_amount"].to_numpy()[top_pos]
         
         st.dataframe(
             display_df,
@@ -483,52 +573,13 @@ st.markdown("###")
 st.markdown('<div class="section-header">📈 项目概率分布概览</div>', unsafe_allow_html=True)
 
 if not df.empty:
-    # 统计各区间的数量
-    bins = [0, 30, 50, 80, 101]
-    labels = ['低概率 (<30%)', '中概率 (30-50%)', '高概率 (50-80%)', '准成交 (≥80%)']
-    df['prob_cat'] = pd.cut(df['_rate'], bins=bins, labels=labels, right=False)
-    prob_counts = df['prob_cat'].value_counts().reindex(labels).reset_index()
-    prob_counts.columns = ['类型', '数量']
-    
-    # 颜色映射
-    color_map = {
-        '低概率 (<30%)': '#94a3b8',
-        '中概率 (30-50%)': '#60a5fa',
-        '高概率 (50-80%)': '#818cf8',
-        '准成交 (≥80%)': '#34d399'
-    }
-
-    fig_bar = px.bar(
-        prob_counts, 
-        x='数量', 
-        y='类型', 
-        orientation='h',
-        text='数量',
-        color='类型',
-        color_discrete_map=color_map
-    )
-    
-    fig_bar.update_layout(
-        height=250,
-        xaxis_title="",
-        yaxis_title="",
-        showlegend=False,
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-        margin=dict(l=0, r=0, t=0, b=0),
-        xaxis=dict(showgrid=False, showticklabels=False), # 隐藏X轴，追求极简
-    )
-    fig_bar.update_traces(textposition='auto', textfont_size=14)
+    # 统计各区间的数量：区间 [0,30) [30,50) [50,80) [80,101)，区间外和空值不计
+    rates = rate_valid[(rate_valid >= 0) & (rate_valid < 101)]
+    counts = np.bincount(np.searchsorted([30, 50, 80], rates, side='right'), minlength=4)
+    fig_bar = build_rate_bar(tuple(int(c) for c in counts))
     
     st.plotly_chart(fig_bar, use_container_width=True, config={'displayModeBar': False})
 
 # 页脚
 st.markdown("---")
-st.markdown(
-    f"""
-    <div style='text-align: center; color: #94a3b8; font-size: 0.8rem;'>
-        Sales Forecast System &copy; 2025 · Powered by Feishu & Streamlit
-    </div>
-    """, 
-    unsafe_allow_html=True
-)
+_render_html(_FOOTER_HTML)
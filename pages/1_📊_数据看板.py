@@ -51,7 +51,7 @@ if "_final_amount" not in df.columns:
     st.error("❌ 数据未包含 _final_amount 列。请检查 data_manager 标准化流程。")
     st.stop()
 
-df = df.copy()
+# get_active_data() 返回的已是会话数据的副本，可直接修改，不再复制
 
 
 # ----------------------------
@@ -167,19 +167,13 @@ for col in ["开始时间", "预计截止时间", "交付时间"]:
     if col in preview_df.columns:
         preview_df[col] = pd.to_datetime(preview_df[col], errors="coerce").dt.strftime("%Y-%m-%d").fillna("")
 
-# 金额格式化
+# 金额格式化：一次正则替换去掉千分位、货币符号、"万"/"万元"和空白
+# （"万" 与 "元" 之间夹着的千分位/货币符号一并去掉，与逐个替换的结果一致）
+AMOUNT_JUNK_PATTERN = r"[,¥￥\s]|万[,¥￥]*元?"
 if "金额" in preview_df.columns:
-    s = preview_df["金额"].astype(str)
-    s = (
-        s.str.replace(",", "", regex=False)
-         .str.replace("¥", "", regex=False)
-         .str.replace("￥", "", regex=False)
-         .str.replace("万元", "", regex=False)
-         .str.replace("万", "", regex=False)
-         .str.replace(r"\s+", "", regex=True)
-    )
+    s = preview_df["金额"].astype(str).str.replace(AMOUNT_JUNK_PATTERN, "", regex=True)
     amt = pd.to_numeric(s, errors="coerce")
-    preview_df["金额"] = amt.apply(lambda x: "" if pd.isna(x) else f"{x:,.2f}")
+    preview_df["金额"] = ["" if x != x else f"{x:,.2f}" for x in amt.to_numpy()]
 
 # 列表/字典转字符串
 for col in ["交付内容", "当前进展"]:
@@ -188,18 +182,25 @@ for col in ["交付内容", "当前进展"]:
             lambda x: ", ".join(x) if isinstance(x, list) else ("" if pd.isna(x) else str(x))
         )
 
+# 筛选（只读预览，用原生表格展示，自带排序）
+f1, f2, f3 = st.columns(3)
+f_client = f1.text_input("客户包含", key="dash_f_client").strip()
+business_options = sorted(preview_df["业务线"].dropna().astype(str).unique()) if "业务线" in preview_df.columns else []
+f_business = f2.selectbox("业务线", ["全部"] + business_options, key="dash_f_business")
+f_progress = f3.text_input("当前进展包含", key="dash_f_progress").strip()
+
+mask = pd.Series(True, index=preview_df.index)
+if f_client and "客户" in preview_df.columns:
+    mask &= preview_df["客户"].astype(str).str.contains(f_client, regex=False, na=False)
+if f_business != "全部":
+    mask &= preview_df["业务线"].astype(str) == f_business
+if f_progress and "当前进展" in preview_df.columns:
+    mask &= preview_df["当前进展"].str.contains(f_progress, regex=False, na=False)
+if not mask.all():
+    preview_df = preview_df[mask]
+
 # 渲染表格
-DisplayHelper.render_aggrid_table(
-    preview_df,
-    key="dashboard_project_list",
-    page_size=20,
-    height=600,
-    enable_selection=True,
-    enable_filtering=True,
-    enable_sorting=True,
-    theme="alpine",
-    return_mode="filtered",
-)
+st.dataframe(preview_df, hide_index=True, use_container_width=True, height=600)
 
 # 下载功能
 with st.expander("📥 下载当前展示数据", expanded=False):
@@ -22,6 +22,7 @@ import datetime as dt
 import json
 from typing import Dict, Any, List
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 from data.data_manager import data_manager
@@ -121,6 +122,58 @@ def timestamp_to_date_str(ts) -> str:
         return ""
 
 
+def dates_to_timestamps(dates: pd.Series) -> List[Any]:
+    """整列版 date_to_timestamp：datetime 列 -> 毫秒时间戳列表，NaT 为 None"""
+    if dates.dt.tz is not None:
+        # 与 Timestamp.timestamp() 一致：带时区的按 UTC 计算
+        dates = dates.dt.tz_convert("UTC").dt.tz_localize(None)
+    ms = dates.to_numpy(dtype="datetime64[ms]").astype(np.int64)
+    return [int(v) if ok else None for v, ok in zip(ms, dates.notna().to_numpy())]
+
+
+def timestamps_to_date_strs(timestamps: List[Any]) -> List[str]:
+    """整列版 timestamp_to_date_str：datetime64 可表示范围内的数值时间戳一次换算，其余取值逐个按原函数处理"""
+    is_num = [
+        isinstance(ts, (int, float, np.integer, np.floating)) and not isinstance(ts, bool) and -9e15 < ts < 9e15
+        for ts in timestamps
+    ]
+    nums = pd.Series([ts if ok else np.nan for ts, ok in zip(timestamps, is_num)], dtype="float64")
+    try:
+        strs = pd.to_datetime(nums, unit="ms", errors="coerce").dt.strftime("%Y-%m-%d").fillna("")
+    except (OverflowError, ValueError):
+        return [timestamp_to_date_str(ts) for ts in timestamps]
+    return [s if ok else timestamp_to_date_str(ts) for s, ok, ts in zip(strs, is_num, timestamps)]
+
+
+def apply_template_to_projects(
+    template_stages: List[Dict],
+    start_dates: pd.Series,
+    delivery_dates: pd.Series,
+) -> List[List[Dict]]:
+    """整列版 apply_template_with_dates：每个节点对所有项目一次算出日期，返回每个项目的节点列表
+
+    两列都是 datetime 类型时整列计算（循环次数为节点数），否则逐个项目调用 apply_template_with_dates。
+    """
+    if pd.api.types.is_datetime64_any_dtype(start_dates) and pd.api.types.is_datetime64_any_dtype(delivery_dates):
+        try:
+            stage_cols = []
+            for stage in template_stages:
+                base_dates = start_dates if stage.get("base", "交付时间") == "开始时间" else delivery_dates
+                pay_dates = base_dates + pd.DateOffset(months=stage.get("offset_months", 0))
+                stage_cols.append((stage.get("name", ""), stage.get("ratio", 0), dates_to_timestamps(pay_dates)))
+            return [
+                [{"name": name, "ratio": ratio, "date": dates[i]} for name, ratio, dates in stage_cols]
+                for i in range(len(start_dates))
+            ]
+        except Exception:
+            # 日期越界等异常时退回逐个计算（单个日期出错只影响该节点）
+            pass
+    return [
+        apply_template_with_dates(template_stages, s, d)
+        for s, d in zip(start_dates, delivery_dates)
+    ]
+
+
 def apply_template_with_dates(
     template_stages: List[Dict],
     start_date,
@@ -154,57 +207,71 @@ def apply_template_with_dates(
 # ============================================================
 # PaymentSchedule Service（简化版，支持 JSON 存储）
 # ============================================================
+def _parse_stages(stages_json) -> List[Dict]:
+    """付款节点 JSON -> list，空值或无法解析时为空列表"""
+    try:
+        return json.loads(stages_json) if stages_json else []
+    except (json.JSONDecodeError, TypeError):
+        return []
+
+
+@st.cache_data(ttl=120, show_spinner=False)
+def _load_payment_schedule(_client: FeishuClient, table_id: str) -> pd.DataFrame:
+    """拉取付款节奏表，并预先解析付款节点 JSON（_stages 列）；加载失败时抛出异常，不会缓存失败结果"""
+    records = _client.get_records(table_id) or []
+
+    rows = []
+    for item in records:
+        if item is None:
+            continue
+        fields = item.get("fields", {}) or {}
+        rows.append({
+            "_ps_record_id": item.get("record_id"),
+            "record_id": fields.get("record_id", ""),
+            "template_name": fields.get("template_name", ""),
+            "payment_stages": fields.get("payment_stages", "[]"),
+        })
+    if not rows:
+        return pd.DataFrame()
+
+    df = pd.DataFrame(rows)
+    df["_stages"] = df["payment_stages"].map(_parse_stages)
+    return df
+
+
 class PaymentScheduleService:
     def __init__(self, client: FeishuClient, table_id: str):
         self.client = client
         self.table_id = table_id
         self._cache = None
+        # record_id -> (template_name, stages)，首次查询时由 _cache 构建
+        self._index = None
 
     def load(self, force_refresh=False) -> pd.DataFrame:
+        """读取付款节奏表（跨 rerun 缓存 120 秒，force_refresh 时重新拉取）"""
         if self._cache is not None and not force_refresh:
             return self._cache
+        if force_refresh:
+            _load_payment_schedule.clear()
+        self._index = None
         try:
-            records = self.client.get_records(self.table_id)
-            if records is None:
-                records = []
+            self._cache = _load_payment_schedule(self.client, self.table_id)
         except Exception as e:
             st.warning(f"加载付款节奏表失败: {e}")
             return pd.DataFrame()
-
-        if not records:
-            self._cache = pd.DataFrame()
-            return self._cache
-
-        rows = []
-        for item in records:
-            if item is None:
-                continue
-            fields = item.get("fields", {}) or {}
-            rows.append({
-                "_ps_record_id": item.get("record_id"),
-                "record_id": fields.get("record_id", ""),
-                "template_name": fields.get("template_name", ""),
-                "payment_stages": fields.get("payment_stages", "[]"),
-            })
-        self._cache = pd.DataFrame(rows) if rows else pd.DataFrame()
         return self._cache
 
     def get_stages(self, source_record_id: str) -> tuple:
         """返回 (template_name, stages_list)"""
-        df = self.load()
-        if df.empty or "record_id" not in df.columns:
-            return "", []
-        hit = df[df["record_id"] == source_record_id]
-        if hit.empty:
-            return "", []
-        row = hit.iloc[0]
-        template_name = row.get("template_name", "")
-        stages_json = row.get("payment_stages", "[]")
-        try:
-            stages = json.loads(stages_json) if stages_json else []
-        except json.JSONDecodeError:
-            stages = []
-        return template_name, stages
+        if self._index is None:
+            df = self.load()
+            if df.empty or "record_id" not in df.columns:
+                self._index = {}
+            else:
+                # 同一 record_id 有多条记录时取第一条；空 record_id 不参与匹配
+                first = df[df["record_id"].notna()].drop_duplicates("record_id")
+                self._index = dict(zip(first["record_id"], zip(first["template_name"], first["_stages"])))
+        return self._index.get(source_record_id, ("", []))
 
     def save(self, source_record_id: str, template_name: str, stages: List[Dict]):
         df = self.load(force_refresh=True)
@@ -225,7 +292,9 @@ class PaymentScheduleService:
             self.client.update_record(self.table_id, ps_record_id, fields)
         else:
             self.client.create_record(self.table_id, fields)
+        _load_payment_schedule.clear()
         self._cache = None
+        self._index = None
 
 
 # ============================================================
@@ -242,7 +311,7 @@ if "record_id" not in df.columns or "_final_amount" not in df.columns:
     st.error("缺少 record_id / _final_amount 字段")
     st.stop()
 
-df = df.copy()
+# get_active_data() 返回的已是会话数据的副本，可直接修改，不再复制
 
 
 # ============================================================
@@ -498,33 +567,55 @@ st.divider()
 st.subheader("📊 所有项目付款节奏总览")
 
 # 汇总所有项目的付款节奏
-all_payment_rows = []
-for _, row in df.iterrows():
-    rid = row.get("record_id")
-    _, stages = ps_service.get_stages(rid)
-    
+def _column_or_none(col: str) -> pd.Series:
+    return df[col] if col in df.columns else pd.Series([None] * len(df), index=df.index, dtype=object)
+
+project_stages = [ps_service.get_stages(rid)[1] for rid in df["record_id"]]
+
+# 没有保存配置的项目使用业务线的默认模板：同一模板的项目一起整列计算付款日期
+business_lines = df["业务线"] if "业务线" in df.columns else pd.Series([""] * len(df), index=df.index)
+start_dates = _column_or_none("开始时间")
+if pd.api.types.is_datetime64_any_dtype(_column_or_none("交付时间")):
+    delivery_dates = df["交付时间"]  # datetime 列中没有空值判假的元素，不会回退到预计截止时间
+else:
+    delivery_dates = pd.Series(
+        [d or e for d, e in zip(_column_or_none("交付时间"), _column_or_none("预计截止时间"))],
+        index=df.index,
+        dtype=object,
+    )
+
+by_template: Dict[str, List[int]] = {}
+for i, (stages, business_line) in enumerate(zip(project_stages, business_lines)):
     if not stages:
-        # 使用默认模板
-        default_template = get_default_template_for_business(row.get("业务线", ""))
-        template_def = get_template(default_template)
-        stages = apply_template_with_dates(
-            template_def,
-            row.get("开始时间"),
-            row.get("交付时间") or row.get("预计截止时间"),
-        )
-    
+        by_template.setdefault(get_default_template_for_business(business_line), []).append(i)
+for template_name, positions in by_template.items():
+    filled = apply_template_to_projects(
+        get_template(template_name),
+        start_dates.iloc[positions],
+        delivery_dates.iloc[positions],
+    )
+    for i, stages in zip(positions, filled):
+        project_stages[i] = stages
+
+all_payment_rows = []
+stage_dates = []
+for (_, row), stages in zip(df.iterrows(), project_stages):
     amount = row.get("_final_amount", 0)
     for stage in stages:
+        stage_dates.append(stage.get("date"))
         all_payment_rows.append({
             "客户": row.get("客户", ""),
             "业务线": row.get("业务线", ""),
             "付款节点": stage.get("name", ""),
             "比例": f"{stage.get('ratio', 0) * 100:.0f}%",
             "金额(万)": round(amount * stage.get("ratio", 0), 2),
-            "付款日期": timestamp_to_date_str(stage.get("date")),
-            "付款月份": timestamp_to_date_str(stage.get("date"))[:7] if stage.get("date") else "",
         })
 
+# 付款日期整列换算
+for payment_row, date_str, ts in zip(all_payment_rows, timestamps_to_date_strs(stage_dates), stage_dates):
+    payment_row["付款日期"] = date_str
+    payment_row["付款月份"] = date_str[:7] if ts else ""
+
 all_payments_df = pd.DataFrame(all_payment_rows)
 
 if not all_payments_df.empty:
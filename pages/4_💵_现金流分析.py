@@ -200,7 +200,7 @@ def calculate_unified_cash_flow(df: pd.DataFrame, ps_service: PaymentScheduleSer
     
     all_cash_flows = []
     
-    for _, row in df.iterrows():
+    for row in df.to_dict("records"):
         record_id = row.get("record_id", "")
         revenue = row.get("_final_amount", 0)
         
@@ -414,13 +414,15 @@ from core.config_manager import config_manager
 
 BUSINESS_LINES = ["光谱设备/服务", "配液设备", "自动化项目"]
 
-cash_cfg = config_manager.render_cashflow_base_ui(sidebar=True, header="⚙️ 现金流配置")
-current_cash = cash_cfg["current_cash"]
+# 侧边栏配置控件的修改合并为一次落盘
+with config_manager.batch_updates():
+    cash_cfg = config_manager.render_cashflow_base_ui(sidebar=True, header="⚙️ 现金流配置")
+    current_cash = cash_cfg["current_cash"]
 
-tax_rate = config_manager.render_tax_rate_ui(sidebar=True, header="")
+    tax_rate = config_manager.render_tax_rate_ui(sidebar=True, header="")
 
-material_ratios = config_manager.render_material_ratios_ui(
-    BUSINESS_LINES, sidebar=True, header="", default_ratio=0.30)
+    material_ratios = config_manager.render_material_ratios_ui(
+        BUSINESS_LINES, sidebar=True, header="", default_ratio=0.30)
 
 st.sidebar.divider()
 st.sidebar.subheader("📅 预测时间范围")
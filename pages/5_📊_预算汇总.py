@@ -255,10 +255,12 @@ from core.config_manager import config_manager
 
 BUSINESS_LINES = ["光谱设备/服务", "配液设备", "自动化项目"]
 
-material_ratios = config_manager.render_material_ratios_ui(
-    BUSINESS_LINES, sidebar=True, header="⚙️ 预算配置", default_ratio=0.30)
+# 侧边栏配置控件的修改合并为一次落盘
+with config_manager.batch_updates():
+    material_ratios = config_manager.render_material_ratios_ui(
+        BUSINESS_LINES, sidebar=True, header="⚙️ 预算配置", default_ratio=0.30)
 
-tax_rate = config_manager.render_tax_rate_ui(sidebar=True, header="")
+    tax_rate = config_manager.render_tax_rate_ui(sidebar=True, header="")
 
 # === 时间段筛选 ===
 st.sidebar.divider()
@@ -199,9 +199,11 @@ with tab5:
         )
         
         if st.form_submit_button("💾 保存飞书配置"):
-            # 使用正确的 set_config 调用方式
-            config_manager.set_config("feishu", "app_id", feishu_app_id)
-            config_manager.set_config("feishu", "app_secret", feishu_app_secret)
+            # 两个字段一起更新，只写一次盘
+            config_manager.update_category("feishu", {
+                "app_id": feishu_app_id,
+                "app_secret": feishu_app_secret,
+            })
             st.success("✅ 飞书配置已保存！")
 
 # ============================================================
@@ -0,0 +1,46 @@
+# tests/test_marketing_dates.py - 市场推广日期解析
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.marketing_service import parse_feishu_dates
+
+
+def test_mixed_timestamps_tz_strings_and_junk():
+    """毫秒/秒时间戳、带不同时区的文本、无效值混在一列"""
+    series = pd.Series([
+        1709604000000,
+        "2024-03-05T10:00:00+08:00",
+        "2024-03-05T10:00:00+09:00",
+        "junk",
+        None,
+        1709604000,
+        {"value": 1709604000000},
+        "2024-01-02",
+        5,
+    ])
+    result = parse_feishu_dates(series)
+
+    assert result.dtype == "datetime64[ns]"
+    assert result.tolist() == [
+        pd.Timestamp("2024-03-05 02:00:00"),
+        pd.Timestamp("2024-03-05 10:00:00"),
+        pd.Timestamp("2024-03-05 10:00:00"),
+        pd.NaT,
+        pd.NaT,
+        pd.Timestamp("2024-03-05 02:00:00"),
+        pd.Timestamp("2024-03-05 02:00:00"),
+        pd.Timestamp("2024-01-02"),
+        pd.NaT,
+    ]
+
+
+def test_single_timezone_keeps_local_time():
+    """同一时区的文本整列解析，保留本地时间（日期不因换算到 UTC 而提前一天）"""
+    result = parse_feishu_dates(pd.Series(["2024-03-05T23:00:00+08:00", "2024-03-06T01:00:00+08:00"]))
+
+    assert result.dtype == "datetime64[ns]"
+    assert result.dt.strftime("%Y-%m-%d").tolist() == ["2024-03-05", "2024-03-06"]
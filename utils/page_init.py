@@ -10,11 +10,25 @@
 
 import streamlit as st
 import os
+import time
 from datetime import datetime, timezone, timedelta
 
 # 北京时区
 BEIJING_TZ = timezone(timedelta(hours=8))
 
+# 两次全量刷新之间的最短间隔（秒），首页和各页面侧边栏的刷新按钮共用
+REFRESH_MIN_INTERVAL = 5.0
+
+
+def refresh_allowed() -> bool:
+    """距本会话上次全量刷新已超过最短间隔（连点、刷新期间排队的点击返回 False）"""
+    return time.monotonic() - st.session_state.get("_last_refresh", float("-inf")) > REFRESH_MIN_INTERVAL
+
+
+def mark_refreshed():
+    """记录本会话的全量刷新时间（刷新完成后调用）"""
+    st.session_state["_last_refresh"] = time.monotonic()
+
 
 def get_current_page_name() -> str:
     """
@@ -237,16 +251,21 @@ def render_sidebar_footer():
         st.caption(f"🕐 上次更新: {datetime.now(BEIJING_TZ).strftime('%H:%M')}")
         
         if st.button("🔄 刷新全量数据", use_container_width=True, key="sidebar_refresh_btn"):
-            with st.spinner("正在同步飞书数据..."):
-                try:
-                    data_manager.set_state_store(st.session_state)
-                    data_manager.clear_cache(state=st.session_state)
-                    data_manager.get_active_data(force_reload=True, state=st.session_state)
-                except Exception:
-                    # 如果上面方法失败，用简单方式清缓存
-                    st.cache_data.clear()
-            st.success("数据已更新")
-            st.rerun()
+            # 刷新刚结束又点（连点、刷新期间排队的点击）时不再重复拉取飞书全量数据
+            if refresh_allowed():
+                with st.spinner("正在同步飞书数据..."):
+                    try:
+                        data_manager.set_state_store(st.session_state)
+                        data_manager.clear_cache(state=st.session_state)
+                        data_manager.get_active_data(force_reload=True, state=st.session_state)
+                    except Exception:
+                        # 如果上面方法失败，用简单方式清缓存
+                        st.cache_data.clear()
+                mark_refreshed()
+                st.success("数据已更新")
+                st.rerun()
+            else:
+                st.info("数据刚刚已刷新，请稍后再试")
 
 
 def init_page(page_name: str = None, show_sidebar: bool = True):